@@ -0,0 +1,99 @@
+"""Benchmark dei byte di attributi salvati dal recorder per ogni riga di stato dei tracker.
+
+Porta un tracker in ciascuno stato tipico (a casa, in una zona extra, fuori casa, adattivo in una zona extra)
+contro lo stand-in di hass, compone gli attributi come li scrive Home Assistant (state_attributes,
+extra_state_attributes e friendly_name) e li serializza con l'encoder JSON del core:
+
+- all: tutti gli attributi, come li salverebbe il recorder senza _unrecorded_attributes
+- recorded: gli attributi rimasti dopo l'esclusione di _unrecorded_attributes, cioè la riga effettivamente salvata
+
+Salva i risultati in JSON.
+
+Uso:
+    python benchmarks/bench_attributes.py --output bench_attributes.json
+"""
+from __future__ import annotations
+import argparse
+import json
+import sys
+from typing import Any, Dict
+
+from fake_hass import CountingTracker, FakeHass, add_entities, build_runtime
+from homeassistant.const import ATTR_FRIENDLY_NAME
+from homeassistant.helpers.json import json_bytes
+from custom_components.wifi_sensor_tracker.zones import ZoneTable
+
+SSID_HOME = "Home"
+SSID_WORK = "Office"
+NOT_CONNECTED = "<not connected>"
+
+# Scenario → (SSID riportato dal sensore, consider_home adattivo)
+SCENARIOS = {
+    "home": (SSID_HOME, False),
+    "extra_zone": (SSID_WORK, False),
+    "not_home": (NOT_CONNECTED, False),
+    "extra_zone_adaptive": (SSID_WORK, True),
+}
+
+
+def _attributes(tracker: CountingTracker) -> Dict[str, Any]:
+    """Attributi dello stato nell'ordine in cui li compone Entity prima della scrittura."""
+    attributes = dict(tracker.state_attributes or {})
+    attributes.update(tracker.extra_state_attributes or {})
+    attributes[ATTR_FRIENDLY_NAME] = tracker.name
+    return attributes
+
+
+def measure() -> list:
+    """Byte JSON degli attributi per riga, con e senza gli attributi esclusi dal recorder."""
+    hass = FakeHass()
+    hass.states.async_set("zone.home", "0", {"friendly_name": "Home", "latitude": 45.4642, "longitude": 9.19})
+    hass.states.async_set("zone.office", "0", {"friendly_name": "Office", "latitude": 45.4781, "longitude": 9.2275})
+    runtime = build_runtime(hass)
+    # Il consider_home adattivo resta al valore dell'entry: nessuno Store da caricare
+    runtime.adaptive.loaded = True
+    zone_table = ZoneTable(runtime.zone_cache, SSID_HOME, {SSID_WORK: "zone.office"})
+    # Sensori con nomi della stessa lunghezza: friendly_name pesa uguale in ogni scenario
+    trackers = {
+        name: CountingTracker(hass, f"sensor.phone_{i}_wifi_connection", 180, runtime, zone_table, adaptive=adaptive)
+        for i, (name, (_ssid, adaptive)) in enumerate(SCENARIOS.items())
+    }
+    for tracker in trackers.values():
+        hass.states.async_set(tracker._sensor, SSID_HOME)
+    add_entities(trackers.values())
+    for name, (ssid, _adaptive) in SCENARIOS.items():
+        hass.states.async_set(trackers[name]._sensor, ssid)
+    # Le uscite devono arrivare a not_home
+    hass.advance(3600)
+
+    results = []
+    for name, tracker in trackers.items():
+        attributes = _attributes(tracker)
+        recorded = {k: v for k, v in attributes.items() if k not in tracker._unrecorded_attributes}
+        results.append({
+            "scenario": name,
+            "state": tracker.state,
+            "all_bytes": len(json_bytes(attributes)),
+            "recorded_bytes": len(json_bytes(recorded)),
+            "recorded": recorded,
+        })
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="bench_attributes.json", help="File JSON dei risultati")
+    args = parser.parse_args(argv)
+
+    results = measure()
+    for result in results:
+        print(f"{result['scenario']:<20} state={result['state']:<10} all={result['all_bytes']}B recorded={result['recorded_bytes']}B")
+
+    with open(args.output, "w", encoding="utf-8") as fp:
+        json.dump({"python": sys.version.split()[0], "results": results}, fp, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
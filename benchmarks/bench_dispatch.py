@@ -0,0 +1,152 @@
+"""Benchmark del dispatcher condiviso contro un listener async_track_state_change_event per entità.
+
+Usa un core Home Assistant reale (non avviato) così da misurare le sottoscrizioni del core e non uno stand-in:
+
+- per_entity: ogni sensore registra il proprio async_track_state_change_event, come facevano i tracker
+- dispatcher: un solo SensorStateDispatcher con una voce per sensore, come l'integrazione attuale
+- baseline: nessun listener, il solo costo di async_set nella state machine
+
+Per ogni modalità e numero di sensori riporta costo per evento (p50/p99 e eventi/s) e memoria allocata
+dalle sottoscrizioni, salvando i risultati in JSON.
+
+Uso:
+    python benchmarks/bench_dispatch.py --sensors 10,100,1000 --rounds 20 --output bench_dispatch.json
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import fake_hass  # noqa: F401  (rende importabile custom_components)
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_state_change_event
+from custom_components.wifi_sensor_tracker.dispatcher import SensorStateDispatcher
+
+MODES = ("baseline", "per_entity", "dispatcher")
+SSIDS = ("Home", "<not connected>")
+
+
+def _percentile(sorted_values: List[int], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index] / 1000.0
+
+
+def _subscribe(hass: HomeAssistant, mode: str, sensors: List[str], on_event: Callable) -> Callable[[], None]:
+    """Registra i listener della modalità e restituisce la funzione per rimuoverli tutti."""
+    if mode == "per_entity":
+        removers = []
+        for sensor in sensors:
+            @callback
+            def _listener(event, _sensor=sensor):
+                on_event(event.data["new_state"])
+            removers.append(async_track_state_change_event(hass, [sensor], _listener))
+        return lambda: [remove() for remove in removers]
+    if mode == "dispatcher":
+        dispatcher = SensorStateDispatcher(hass)
+        removers = [dispatcher.async_add(sensor, on_event) for sensor in sensors]
+        return lambda: [remove() for remove in removers]
+    return lambda: None
+
+
+async def run(mode: str, count: int, rounds: int) -> Dict[str, float]:
+    """Misura costo per evento e memoria delle sottoscrizioni di count sensori nella modalità indicata."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        sensors = [f"sensor.phone_{i}_wifi_connection" for i in range(count)]
+        # Altre entità che cambiano stato: il filtro deve scartarle senza raggiungere i tracker
+        noise = [f"sensor.other_{i}" for i in range(count)]
+        for entity_id in sensors + noise:
+            hass.states.async_set(entity_id, SSIDS[1])
+
+        received = 0
+
+        @callback
+        def _on_event(_new_state) -> None:
+            nonlocal received
+            received += 1
+
+        # Memoria: solo le sottoscrizioni, con la state machine già popolata
+        gc.collect()
+        tracemalloc.start()
+        before, _peak = tracemalloc.get_traced_memory()
+        unsubscribe = _subscribe(hass, mode, sensors, _on_event)
+        gc.collect()
+        after, _peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # Tempi: ogni giro cambia lo stato di tutti i sensori e di altrettante entità estranee
+        latencies: List[int] = []
+        perf = time.perf_counter_ns
+        set_state = hass.states.async_set
+        started = time.perf_counter()
+        for round_ in range(rounds):
+            ssid = SSIDS[round_ % 2]
+            for entity_id in sensors:
+                start = perf()
+                set_state(entity_id, ssid)
+                latencies.append(perf() - start)
+            for entity_id in noise:
+                set_state(entity_id, ssid)
+            await hass.async_block_till_done()
+        elapsed = time.perf_counter() - started
+
+        unsubscribe()
+        await hass.async_stop(force=True)
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "sensors": count,
+        "events": len(latencies),
+        "events_delivered": received,
+        "events_per_sec": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_us": round(_percentile(latencies, 50), 3),
+        "p99_us": round(_percentile(latencies, 99), 3),
+        "subscription_bytes": after - before,
+        "bytes_per_sensor": round((after - before) / count, 1),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sensors", default="10,100,1000", help="Numero di sensori, separati da virgola")
+    parser.add_argument("--rounds", type=int, default=20, help="Giri di cambi di stato per ogni misura")
+    parser.add_argument("--modes", default=",".join(MODES), help="Modalità da confrontare, separate da virgola")
+    parser.add_argument("--output", default="bench_dispatch.json", help="File JSON dei risultati")
+    args = parser.parse_args(argv)
+
+    results = []
+    for count in (int(c) for c in args.sensors.split(",") if c):
+        for mode in (m for m in args.modes.split(",") if m):
+            result = asyncio.run(run(mode, count, args.rounds))
+            results.append(result)
+            print(
+                f"{mode:<11} sensors={count:<6} events/s={result['events_per_sec']:<12} "
+                f"p50={result['p50_us']}us p99={result['p99_us']}us "
+                f"subscriptions={result['subscription_bytes'] / 1024:.1f}KiB ({result['bytes_per_sensor']} B/sensor)"
+            )
+
+    report = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "rounds": args.rounds,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as fp:
+        json.dump(report, fp, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Benchmark della memoria occupata dai tracker, misurata con tracemalloc.
+
+Crea blocchi di tracker contro lo stand-in di hass, li porta in uno stato realistico
+(metà a casa, un quarto in una zona extra, un quarto in uscita con consider_home in corso)
+e riporta i byte allocati per 1.000 tracker, salvando i risultati in JSON.
+
+Uso:
+    python benchmarks/bench_memory.py --trackers 1000,5000 --output bench_memory.json
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+
+from fake_hass import FakeHass, build_trackers
+
+SSID_HOME = "Home"
+SSID_WORK = "Office"
+
+
+def measure(count: int) -> dict:
+    """Byte allocati da count tracker, dallo stato iniziale alla fine del riscaldamento."""
+    hass = FakeHass()
+    hass.states.async_set("zone.office", "0", {"friendly_name": "Office", "latitude": 45.0, "longitude": 9.0})
+    # Prima chiamata a vuoto per escludere dalla misura import e strutture allocate una sola volta
+    build_trackers(hass, 1, SSID_HOME, {SSID_WORK: "zone.office"})
+
+    gc.collect()
+    tracemalloc.start()
+    before, _peak = tracemalloc.get_traced_memory()
+    hass = FakeHass()
+    hass.states.async_set("zone.office", "0", {"friendly_name": "Office", "latitude": 45.0, "longitude": 9.0})
+    trackers = build_trackers(hass, count, SSID_HOME, {SSID_WORK: "zone.office"})
+    for i in range(count):
+        sensor = f"sensor.phone_{i}_wifi_connection"
+        hass.states.async_set(sensor, SSID_HOME if i % 4 < 2 else SSID_WORK)
+        if i % 4 == 3:
+            hass.states.async_set(sensor, "<not connected>")
+    gc.collect()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    used = after - before
+    # Le entità devono restare vive fino alla misura
+    del trackers
+    return {
+        "trackers": count,
+        "bytes": used,
+        "peak_bytes": peak - before,
+        "bytes_per_1000_trackers": round(used * 1000 / count),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trackers", default="1000", help="Numero di tracker, separati da virgola")
+    parser.add_argument("--output", default="bench_memory.json", help="File JSON dei risultati")
+    args = parser.parse_args(argv)
+
+    results = []
+    for count in (int(c) for c in args.trackers.split(",") if c):
+        result = measure(count)
+        results.append(result)
+        print(f"trackers={count:<6} total={result['bytes'] / 1024:.1f}KiB per_1000={result['bytes_per_1000_trackers'] / 1024:.1f}KiB")
+
+    with open(args.output, "w", encoding="utf-8") as fp:
+        json.dump({"python": sys.version.split()[0], "results": results}, fp, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""Benchmark del percorso di aggiornamento dei tracker Wi-Fi.
+
+Esegue N tracker contro lo stand-in di hass in fake_hass.py e li alimenta con flussi di SSID sintetici:
+
+- steady: ogni telefono ripete lo stesso SSID di casa
+- flapping: ogni telefono alterna SSID di casa e "<not connected>"
+- mass_arrival: tutti i telefoni arrivano a casa insieme
+- mass_departure: tutti i telefoni si disconnettono insieme e scade consider_home
+- attribute_churn: SSID invariato, cambiano solo segnale e velocità del link
+- zone_rename: metà dei telefoni in ufficio, la zona viene rinominata e spostata ad ogni giro
+
+Per ogni scenario riporta eventi/s, latenza p50/p99 per evento, scritture di stato e picco di memoria,
+e salva i risultati in un file JSON confrontabile tra versioni.
+
+Uso:
+    python benchmarks/bench_tracker.py --trackers 10,100,1000 --rounds 20 --output bench_results.json
+"""
+from __future__ import annotations
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+from fake_hass import CountingTracker, FakeHass, build_trackers
+from custom_components.wifi_sensor_tracker.metrics import async_get_metrics
+
+SSID_HOME = "Home"
+SSID_WORK = "Office"
+NOT_CONNECTED = "<not connected>"
+CONSIDER_HOME = 180
+
+MANIFEST = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "custom_components", "wifi_sensor_tracker", "manifest.json",
+)
+
+
+def _sensor(i: int) -> str:
+    return f"sensor.phone_{i}_wifi_connection"
+
+
+def _setup(count: int):
+    hass = FakeHass()
+    hass.states.async_set("zone.office", "0", {"friendly_name": "Office", "latitude": 45.0, "longitude": 9.0})
+    trackers = build_trackers(hass, count, SSID_HOME, {SSID_WORK: "zone.office"}, CONSIDER_HOME)
+    return hass, trackers
+
+
+def _scenario_steady(hass: FakeHass, count: int, rounds: int, measure: Callable[[str, str], None]) -> None:
+    for i in range(count):
+        hass.states.async_set(_sensor(i), SSID_HOME)
+    for _ in range(rounds):
+        for i in range(count):
+            measure(_sensor(i), SSID_HOME)
+        hass.advance(30)
+
+
+def _scenario_flapping(hass: FakeHass, count: int, rounds: int, measure: Callable[[str, str], None]) -> None:
+    for r in range(rounds):
+        ssid = SSID_HOME if r % 2 == 0 else NOT_CONNECTED
+        for i in range(count):
+            measure(_sensor(i), ssid)
+        hass.advance(10)
+
+
+def _scenario_mass_arrival(hass: FakeHass, count: int, rounds: int, measure: Callable[[str, str], None]) -> None:
+    for r in range(rounds):
+        ssid = SSID_HOME if r % 2 == 0 else SSID_WORK
+        for i in range(count):
+            measure(_sensor(i), ssid)
+        hass.advance(60)
+
+
+def _scenario_mass_departure(hass: FakeHass, count: int, rounds: int, measure: Callable[[str, str], None]) -> None:
+    for _ in range(rounds):
+        for i in range(count):
+            measure(_sensor(i), SSID_HOME)
+        for i in range(count):
+            measure(_sensor(i), NOT_CONNECTED)
+        # Scadenza consider_home: lo scheduler esegue tutte le uscite con un solo risveglio
+        hass.advance(CONSIDER_HOME + 1)
+
+
+def _scenario_attribute_churn(hass: FakeHass, count: int, rounds: int, measure: Callable[..., None]) -> None:
+    for i in range(count):
+        hass.states.async_set(_sensor(i), SSID_HOME, {"bssid": "aa:bb:cc:00:00:01", "link_speed": 866, "rssi": -50})
+    for r in range(rounds):
+        for i in range(count):
+            measure(_sensor(i), SSID_HOME, {"bssid": "aa:bb:cc:00:00:01", "link_speed": 866 - r, "rssi": -50 - r % 20})
+        hass.advance(5)
+
+
+def _scenario_zone_rename(hass: FakeHass, count: int, rounds: int, measure: Callable[..., None]) -> None:
+    for i in range(count):
+        hass.states.async_set(_sensor(i), SSID_WORK if i % 2 else SSID_HOME)
+    for r in range(rounds):
+        # Solo i tracker in ufficio vengono aggiornati, tramite l'indice inverso zona → tracker
+        measure("zone.office", "0", {"friendly_name": f"Office {r}", "latitude": 45.0 + r / 1000, "longitude": 9.0})
+        hass.advance(60)
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "steady": _scenario_steady,
+    "flapping": _scenario_flapping,
+    "mass_arrival": _scenario_mass_arrival,
+    "mass_departure": _scenario_mass_departure,
+    "attribute_churn": _scenario_attribute_churn,
+    "zone_rename": _scenario_zone_rename,
+}
+
+
+def _percentile(sorted_values: List[int], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index] / 1000.0
+
+
+def run_scenario(name: str, count: int, rounds: int) -> Dict[str, float]:
+    """Esegue uno scenario misurando tempi per evento; la memoria viene misurata in un secondo passaggio."""
+    scenario = SCENARIOS[name]
+
+    # Passaggio 1: tempi, senza tracemalloc che rallenterebbe ogni allocazione
+    hass, _trackers = _setup(count)
+    CountingTracker.writes = 0
+    latencies: List[int] = []
+    set_state = hass.states.async_set
+    perf = time.perf_counter_ns
+
+    def _timed(entity_id: str, state: str, attributes=None) -> None:
+        start = perf()
+        set_state(entity_id, state, attributes)
+        latencies.append(perf() - start)
+
+    gc.collect()
+    started = time.perf_counter()
+    scenario(hass, count, rounds, _timed)
+    elapsed = time.perf_counter() - started
+    writes = CountingTracker.writes
+    timers_armed = hass.loop.timers_armed
+    events_dropped = sum(async_get_metrics(hass).sensor_events_dropped.values())
+
+    # Passaggio 2: picco di memoria dello stesso scenario, setup compreso
+    gc.collect()
+    tracemalloc.start()
+    hass, _trackers = _setup(count)
+    scenario(hass, count, rounds, hass.states.async_set)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies.sort()
+    events = len(latencies)
+    return {
+        "scenario": name,
+        "trackers": count,
+        "events": events,
+        "events_per_sec": round(events / elapsed, 1) if elapsed else 0.0,
+        "p50_us": round(_percentile(latencies, 50), 3),
+        "p99_us": round(_percentile(latencies, 99), 3),
+        "state_writes": writes,
+        "events_dropped": events_dropped,
+        "loop_timers_armed": timers_armed,
+        "peak_memory_bytes": peak,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--trackers", default="10,100,1000", help="Numero di tracker, separati da virgola")
+    parser.add_argument("--rounds", type=int, default=20, help="Ripetizioni di ogni scenario")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Scenari da eseguire, separati da virgola")
+    parser.add_argument("--output", default="bench_results.json", help="File JSON dei risultati")
+    args = parser.parse_args(argv)
+
+    with open(MANIFEST, encoding="utf-8") as fp:
+        version = json.load(fp).get("version")
+
+    results = []
+    for count in (int(c) for c in args.trackers.split(",") if c):
+        for name in (s for s in args.scenarios.split(",") if s):
+            result = run_scenario(name, count, args.rounds)
+            results.append(result)
+            print(
+                f"{name:<15} trackers={count:<6} events/s={result['events_per_sec']:<12} "
+                f"p50={result['p50_us']}us p99={result['p99_us']}us writes={result['state_writes']} "
+                f"peak={result['peak_memory_bytes'] / 1024:.1f}KiB"
+            )
+
+    report = {
+        "integration_version": version,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "rounds": args.rounds,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as fp:
+        json.dump(report, fp, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
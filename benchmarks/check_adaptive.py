@@ -0,0 +1,106 @@
+"""Verifica della convergenza del consider_home adattivo su profili di disconnessione sintetici.
+
+Ogni profilo ripete cicli di connessione a casa seguiti da una pausa Wi-Fi di durata fissa e da una riconnessione,
+con il tracker sullo stand-in di hass in fake_hass.py (clock manuale) e i ritardi appresi salvati in uno Store
+di un core Home Assistant reale in una directory temporanea:
+
+- power_saver: pause di 300 s con consider_home 180 s; le prime pause fanno scattare l'uscita,
+  il ritardo appreso deve crescere oltre la pausa e le uscite false devono cessare
+- stable: pause di 20 s con consider_home 180 s; il ritardo appreso deve scendere sotto consider_home
+
+Termina con codice 1 se un profilo non converge.
+
+Uso:
+    python benchmarks/check_adaptive.py --cycles 40
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import sys
+import tempfile
+from typing import Dict, List
+
+from fake_hass import CountingTracker, FakeHass, build_runtime
+from homeassistant.core import HomeAssistant
+from homeassistant.const import STATE_NOT_HOME
+from custom_components.wifi_sensor_tracker.adaptive import MIN_GAPS, AdaptiveConsiderHome
+from custom_components.wifi_sensor_tracker.zones import ZoneTable
+
+SSID_HOME = "Home"
+NOT_CONNECTED = "<not connected>"
+SENSOR = "sensor.phone_wifi_connection"
+CONSIDER_HOME = 180
+# Tempo connesso a casa tra una pausa e la successiva
+CONNECTED_TIME = 600
+
+# Profilo → durata delle pause in secondi
+PROFILES: Dict[str, int] = {
+    "power_saver": 300,
+    "stable": 20,
+}
+
+
+async def run_profile(name: str, gap: int, cycles: int) -> Dict[str, object]:
+    """Esegue cycles pause di gap secondi e restituisce ritardi appresi e uscite false per ciclo."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        core = HomeAssistant(config_dir)
+        hass = FakeHass()
+        runtime = build_runtime(hass)
+        # Ritardi appresi nello Store reale; i tracker restano sul clock manuale dello stand-in
+        runtime.adaptive = AdaptiveConsiderHome(core)
+        await runtime.adaptive.async_load()
+        zone_table = ZoneTable(runtime.zone_cache, SSID_HOME, {})
+        tracker = CountingTracker(hass, SENSOR, CONSIDER_HOME, runtime, zone_table, adaptive=True)
+        hass.states.async_set(SENSOR, SSID_HOME)
+        await tracker.async_added_to_hass()
+
+        delays: List[float] = []
+        departures: List[bool] = []
+        for _ in range(cycles):
+            hass.states.async_set(SENSOR, NOT_CONNECTED)
+            hass.advance_to(hass.clock.now + gap)
+            # Il dispositivo non è mai uscito: not_home qui è una falsa uscita
+            departures.append(tracker.state == STATE_NOT_HOME)
+            hass.states.async_set(SENSOR, SSID_HOME)
+            hass.advance_to(hass.clock.now + CONNECTED_TIME)
+            delays.append(tracker._exit_delay())
+
+        await tracker.async_will_remove_from_hass()
+        await core.async_stop(force=True)
+
+    # Dopo le MIN_GAPS pause necessarie e una di assestamento non devono più esserci uscite false
+    settled = departures[MIN_GAPS + 1:]
+    if gap > CONSIDER_HOME:
+        converged = delays[-1] > gap and not any(settled)
+    else:
+        converged = delays[-1] < CONSIDER_HOME and not any(departures)
+    return {
+        "profile": name,
+        "gap": gap,
+        "initial_delay": CONSIDER_HOME,
+        "final_delay": delays[-1],
+        "false_departures": sum(departures),
+        "false_departures_after_learning": sum(settled),
+        "converged": converged,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=40, help="Pause simulate per profilo")
+    args = parser.parse_args(argv)
+
+    failed = 0
+    for name, gap in PROFILES.items():
+        result = asyncio.run(run_profile(name, gap, args.cycles))
+        print(
+            f"{name:<12} gap={gap}s delay={result['initial_delay']}s→{result['final_delay']}s "
+            f"false_departures={result['false_departures']} (after learning: {result['false_departures_after_learning']}) "
+            f"{'OK' if result['converged'] else 'NOT CONVERGED'}"
+        )
+        failed += not result["converged"]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+"""Stand-in leggero di Home Assistant per eseguire la logica dei tracker fuori da un'istanza reale.
+
+Fornisce solo ciò che usano dispatcher, tabella delle zone, scheduler e tracker: una state machine,
+un bus con event_filter, un loop con call_later e un clock manuale. Richiede il pacchetto
+homeassistant installato (per le classi base delle entità), ma non avvia alcun core.
+Le coroutine delle entità (async_added_to_hass) girano su un event loop asyncio reale,
+i timer dello scheduler sul loop manuale.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+# Rende importabile custom_components.wifi_sensor_tracker dalla root del repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_components.wifi_sensor_tracker.device_tracker import WifiSensorTrackerEntity  # noqa: E402
+from custom_components.wifi_sensor_tracker.runtime import WifiSensorTrackerRuntime  # noqa: E402
+from custom_components.wifi_sensor_tracker.scheduler import ExitScheduler  # noqa: E402
+from custom_components.wifi_sensor_tracker.zones import ZoneTable  # noqa: E402
+
+
+class FakeState:
+    """Stato minimo con la stessa interfaccia di homeassistant.core.State usata dall'integrazione."""
+
+    __slots__ = ("entity_id", "state", "attributes")
+
+    def __init__(self, entity_id: str, state: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.entity_id = entity_id
+        self.state = state
+        self.attributes = attributes or {}
+
+
+class FakeClock:
+    """Clock manuale: il tempo avanza solo quando lo chiede lo scenario."""
+
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class FakeTimerHandle:
+    __slots__ = ("when", "callback", "cancelled")
+
+    def __init__(self, when: float, callback: Callable[[], Any]) -> None:
+        self.when = when
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class FakeLoop:
+    """Registra i timer richiesti; li esegue run_due quando il clock manuale li raggiunge."""
+
+    def __init__(self, clock: FakeClock) -> None:
+        self._clock = clock
+        self.timers: List[FakeTimerHandle] = []
+        self.timers_armed = 0
+
+    def call_later(self, delay: float, callback: Callable[[], Any], *args: Any) -> FakeTimerHandle:
+        handle = FakeTimerHandle(self._clock() + delay, lambda: callback(*args))
+        self.timers.append(handle)
+        self.timers_armed += 1
+        return handle
+
+    def next_when(self) -> Optional[float]:
+        """Istante del prossimo timer attivo, None se non ce ne sono."""
+        self.timers = [h for h in self.timers if not h.cancelled]
+        return min((h.when for h in self.timers), default=None)
+
+    def run_due(self) -> None:
+        due = [h for h in self.timers if not h.cancelled and h.when <= self._clock()]
+        self.timers = [h for h in self.timers if not h.cancelled and h.when > self._clock()]
+        for handle in due:
+            handle.callback()
+
+
+class FakeStates:
+    """State machine ridotta: get, async_all e async_set che genera state_changed sul bus."""
+
+    def __init__(self, bus: "FakeBus") -> None:
+        self._bus = bus
+        self._states: Dict[str, FakeState] = {}
+
+    def get(self, entity_id: str) -> Optional[FakeState]:
+        return self._states.get(entity_id)
+
+    def async_all(self, domain: Optional[str] = None) -> List[FakeState]:
+        if domain is None:
+            return list(self._states.values())
+        return [s for s in self._states.values() if s.entity_id.startswith(f"{domain}.")]
+
+    def async_set(self, entity_id: str, state: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        old_state = self._states.get(entity_id)
+        new_state = FakeState(entity_id, state, attributes)
+        self._states[entity_id] = new_state
+        self._bus.async_fire_state_changed(entity_id, old_state, new_state)
+
+    def async_remove(self, entity_id: str) -> None:
+        old_state = self._states.pop(entity_id, None)
+        self._bus.async_fire_state_changed(entity_id, old_state, None)
+
+
+class FakeBus:
+    """Bus con il solo event_filter sincrono usato dal dispatcher."""
+
+    def __init__(self) -> None:
+        self._listeners: List[tuple] = []
+
+    def async_listen(self, event_type: str, listener: Callable, event_filter: Optional[Callable] = None) -> Callable[[], None]:
+        entry = (event_type, listener, event_filter)
+        self._listeners.append(entry)
+
+        def _remove() -> None:
+            if entry in self._listeners:
+                self._listeners.remove(entry)
+
+        return _remove
+
+    def async_fire_state_changed(self, entity_id: str, old_state: Optional[FakeState], new_state: Optional[FakeState]) -> None:
+        data = {"entity_id": entity_id, "old_state": old_state, "new_state": new_state}
+        event = SimpleNamespace(event_type="state_changed", data=data)
+        for event_type, listener, event_filter in self._listeners:
+            if event_type != "state_changed":
+                continue
+            if event_filter is not None and not event_filter(data):
+                continue
+            listener(event)
+
+
+class FakeHass:
+    """Oggetto hass con states, bus, loop e clock manuale."""
+
+    def __init__(self) -> None:
+        self.clock = FakeClock()
+        self.bus = FakeBus()
+        self.states = FakeStates(self.bus)
+        self.loop = FakeLoop(self.clock)
+        self.data: Dict[str, Any] = {}
+
+    def advance(self, seconds: float) -> None:
+        """Avanza il clock ed esegue i timer del loop arrivati a scadenza."""
+        self.clock.advance(seconds)
+        self.loop.run_due()
+
+    def advance_to(self, when: float) -> None:
+        """Porta il clock a when eseguendo i timer in ordine, ciascuno al proprio istante di scadenza."""
+        while True:
+            next_when = self.loop.next_when()
+            if next_when is None or next_when > when:
+                break
+            self.clock.now = max(self.clock.now, next_when)
+            self.loop.run_due()
+        self.clock.now = max(self.clock.now, when)
+
+
+class CountingTracker(WifiSensorTrackerEntity):
+    """Tracker che conta le scritture di stato invece di inviarle alla state machine."""
+
+    writes = 0
+
+    def async_write_ha_state(self) -> None:
+        CountingTracker.writes += 1
+
+    async def async_get_last_extra_data(self):
+        # Nessuno stato salvato: ogni scenario parte da tracker nuovi
+        return None
+
+
+def build_runtime(hass: FakeHass) -> WifiSensorTrackerRuntime:
+    """Motore condiviso dei tracker con lo scheduler sul clock manuale dello stand-in."""
+    runtime = WifiSensorTrackerRuntime(hass)
+    runtime.exit_scheduler = ExitScheduler(hass, clock=hass.clock)
+    return runtime
+
+
+def add_entities(entities) -> None:
+    """Esegue async_added_to_hass di ogni entità, in ordine, come farebbe il platform."""
+
+    async def _async_add_all() -> None:
+        for entity in entities:
+            await entity.async_added_to_hass()
+
+    # Un event loop reale: ripristino dello stato e caricamenti dallo storage possono sospendersi
+    asyncio.run(_async_add_all())
+
+
+def add_entity(entity) -> None:
+    """Esegue async_added_to_hass come farebbe il platform."""
+    add_entities([entity])
+
+
+def build_trackers(hass: FakeHass, count: int, ssid_home: str, ssid_zone_map: Dict[str, str], consider_home: int = 180, flap_damping: int = 0):
+    """Crea count tracker sui sensori sensor.phone_<n>_wifi_connection e li aggiunge come farebbe il platform."""
+    runtime = build_runtime(hass)
+    zone_table = ZoneTable(runtime.zone_cache, ssid_home, ssid_zone_map)
+    trackers = [
+        CountingTracker(hass, f"sensor.phone_{i}_wifi_connection", consider_home, runtime, zone_table, flap_damping)
+        for i in range(count)
+    ]
+    add_entities(trackers)
+    return trackers
@@ -0,0 +1,378 @@
+"""Replay di storici reali dei sensori Wi-Fi attraverso la logica dei tracker, fuori da Home Assistant.
+
+Legge un export CSV (entity_id,state,last_changed[,attributes]), un file JSONL con gli stessi campi
+o una copia del database SQLite del recorder, riga per riga senza caricarlo in memoria, e li riproduce
+contro lo stand-in di hass in fake_hass.py con il tempo accelerato: i timer consider_home e di smorzamento
+scattano al loro istante simulato. Le righe devono essere in ordine di tempo (--sort per gli export
+raggruppati per entità, a costo di caricarli interamente).
+
+Riporta le transizioni dei tracker e delle Person simulate, le scritture di stato per ora e il throughput,
+così da confrontare l'effetto di consider_home, flap_damping o delle mappe SSID/BSSID su mesi di dati.
+
+La tabella delle zone è costruita dagli stessi dati di un config entry e con la stessa funzione dell'integrazione
+(_entry_options): con --entry si usa direttamente il campo "data" di un entry (es. da .storage/core.config_entries),
+altrimenti i dati vengono composti dalle opzioni della riga di comando. Gli attributi delle zone (nome e coordinate)
+vengono sempre letti e le zone configurate partono dal loro primo stato registrato, come in un'istanza già avviata.
+Il consider_home adattivo non viene simulato: richiede lo storage di Home Assistant.
+
+Uso:
+    python benchmarks/replay.py history.csv --home-ssid Home --zone Office=zone.office \\
+        --consider-home 180 --person alice=sensor.alice_phone_wifi_connection --output replay.json
+    python benchmarks/replay.py history.csv --entry entry.json --output replay.json
+"""
+from __future__ import annotations
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from fake_hass import CountingTracker, FakeHass, add_entity, build_runtime
+from custom_components.wifi_sensor_tracker.bssid import parse_bssid_zones
+from custom_components.wifi_sensor_tracker.device_tracker import _entry_options
+from custom_components.wifi_sensor_tracker.metrics import async_get_metrics
+from custom_components.wifi_sensor_tracker.sensor_index import is_wifi_sensor
+from custom_components.wifi_sensor_tracker.ssid_matcher import parse_ssid_rules
+from custom_components.wifi_sensor_tracker.zones import ENTITY_ID_HOME, ZoneTable
+
+# Riga dello storico: timestamp UTC, entity_id, stato, attributi (None se non letti)
+Row = Tuple[float, str, str, Optional[Dict[str, Any]]]
+
+
+def _timestamp(value: str) -> float:
+    """Timestamp UTC da un valore epoch o ISO 8601."""
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _attributes(raw: Any, need_attributes: bool) -> Optional[Dict[str, Any]]:
+    if not need_attributes or not raw:
+        return None
+    return raw if isinstance(raw, dict) else json.loads(raw)
+
+
+def _is_zone(entity_id: str) -> bool:
+    # Nome e coordinate di una zona sono negli attributi: per le zone vanno letti sempre
+    return entity_id.startswith("zone.")
+
+
+def read_csv(path: str, need_attributes: bool) -> Iterator[Row]:
+    """Righe di un export CSV della cronologia di Home Assistant."""
+    with open(path, newline="", encoding="utf-8") as fp:
+        for record in csv.DictReader(fp):
+            when = record.get("last_changed") or record.get("last_updated")
+            entity_id = record["entity_id"]
+            yield _timestamp(when), entity_id, record["state"], _attributes(record.get("attributes"), need_attributes or _is_zone(entity_id))
+
+
+def read_jsonl(path: str, need_attributes: bool) -> Iterator[Row]:
+    """Righe di un file JSONL, un oggetto stato per riga."""
+    with open(path, encoding="utf-8") as fp:
+        for line in fp:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            when = record.get("last_changed") or record.get("last_updated") or record["timestamp"]
+            entity_id = record["entity_id"]
+            yield (
+                when if isinstance(when, (int, float)) else _timestamp(when),
+                entity_id,
+                record["state"],
+                _attributes(record.get("attributes"), need_attributes or _is_zone(entity_id)),
+            )
+
+
+def read_recorder(path: str, need_attributes: bool, sensors: Optional[List[str]]) -> Iterator[Row]:
+    """Righe della tabella states di una copia del database del recorder (schema con states_meta), in sola lettura."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        metadata = {
+            metadata_id: entity_id
+            for metadata_id, entity_id in conn.execute("SELECT metadata_id, entity_id FROM states_meta")
+            if _is_zone(entity_id) or (entity_id in sensors if sensors else is_wifi_sensor(entity_id))
+        }
+        if not metadata:
+            return
+        placeholders = ",".join("?" * len(metadata))
+        if need_attributes:
+            attributes_column = "a.shared_attrs"
+        else:
+            # Senza voci BSSID servono solo gli attributi delle zone (i metadata_id sono interi letti dal database)
+            zone_ids = ",".join(str(m) for m, entity_id in metadata.items() if _is_zone(entity_id))
+            attributes_column = f"CASE WHEN s.metadata_id IN ({zone_ids}) THEN a.shared_attrs END" if zone_ids else "NULL"
+        cursor = conn.execute(
+            f"SELECT s.metadata_id, s.state, s.last_updated_ts, {attributes_column} FROM states s "
+            f"LEFT JOIN state_attributes a ON s.attributes_id = a.attributes_id "
+            f"WHERE s.metadata_id IN ({placeholders}) ORDER BY s.last_updated_ts",
+            list(metadata),
+        )
+        for metadata_id, state, when, raw_attributes in cursor:
+            entity_id = metadata[metadata_id]
+            yield when, entity_id, state, _attributes(raw_attributes, need_attributes or _is_zone(entity_id))
+    finally:
+        conn.close()
+
+
+def read_rows(path: str, need_attributes: bool, sensors: Optional[List[str]]) -> Iterator[Row]:
+    """Sceglie il lettore in base all'estensione del file."""
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return read_recorder(path, need_attributes, sensors)
+    if path.endswith((".jsonl", ".ndjson")):
+        return read_jsonl(path, need_attributes)
+    return read_csv(path, need_attributes)
+
+
+def first_zone_states(path: str, zones: Iterable[str], sensors: Optional[List[str]], ordered: bool = True) -> Dict[str, Row]:
+    """Primo stato registrato di ogni zona indicata.
+
+    Con righe in ordine di tempo la lettura si ferma quando sono state trovate tutte, altrimenti scorre l'intero file.
+    """
+    wanted = set(zones)
+    found: Dict[str, Row] = {}
+    if not wanted:
+        return found
+    for row in read_rows(path, False, sensors):
+        entity_id = row[1]
+        if entity_id not in wanted:
+            continue
+        if ordered:
+            found[entity_id] = row
+            wanted.discard(entity_id)
+            if not wanted:
+                break
+        elif entity_id not in found or row[0] < found[entity_id][0]:
+            found[entity_id] = row
+    return found
+
+
+def configured_zones(data: Dict[str, Any]) -> List[str]:
+    """Zone usate dal config entry (SSID, BSSID e regole); zone.home è risolta dal core e non serve."""
+    zones = set(data.get("ssid_zones", {}).values())
+    zones.update(b["zone"] for b in data.get("extra_bssids", []))
+    zones.update(r["zone"] for r in data.get("ssid_rules", []))
+    zones.discard(ENTITY_ID_HOME)
+    return sorted(zones)
+
+
+def entry_data(args: argparse.Namespace) -> Dict[str, Any]:
+    """Dati del config entry da riprodurre: letti da --entry o composti dalle opzioni della riga di comando."""
+    if args.entry:
+        with open(args.entry, encoding="utf-8") as fp:
+            data = json.load(fp)
+        # Accetta sia l'entry completo sia il solo campo data
+        data = dict(data.get("data", data))
+        if "ssid_zones" not in data:
+            # Entry nello schema versione 1, non ancora migrato
+            data["ssid_zones"] = {z["ssid"].strip(): z["zone"] for z in data.pop("extra_zones", []) if z.get("ssid")}
+        return data
+    if not args.home_ssid:
+        raise SystemExit("--home-ssid or --entry is required")
+    bssids = parse_bssid_zones("\n".join(args.bssid))
+    rules = parse_ssid_rules("\n".join(args.ssid_rule))
+    if bssids is None or rules is None:
+        raise SystemExit("Invalid --bssid or --ssid-rule value")
+    return {
+        "home_wifi_ssid": args.home_ssid.strip(),
+        "ssid_zones": dict(item.split("=", 1) for item in args.zone),
+        "extra_bssids": bssids,
+        "extra_home_ssids": list(args.extra_home_ssid),
+        "ssid_rules": rules,
+        "ssid_normalize": args.ssid_normalize,
+        "consider_home": args.consider_home,
+        "flap_damping": args.flap_damping,
+    }
+
+
+class ReplayTracker(CountingTracker):
+    """Tracker che registra ogni scrittura di stato invece di inviarla alla state machine."""
+
+    replay: "Replay"
+
+    def async_write_ha_state(self) -> None:
+        CountingTracker.writes += 1
+        self.replay.record_write(self)
+
+
+class Replay:
+    """Crea i tracker al primo evento di ogni sensore e raccoglie transizioni e scritture."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.hass = FakeHass()
+        self.runtime = build_runtime(self.hass)
+        # Stesse opzioni (regole SSID, normalizzazione, BSSID) che l'integrazione ricava dal config entry
+        data = entry_data(args)
+        table_options, self.consider_home, self.flap_damping, _adaptive = _entry_options(SimpleNamespace(data=data))
+        self.zone_table = ZoneTable(self.runtime.zone_cache, **table_options)
+        # In un'istanza avviata le zone esistono già quando arriva il primo evento dei sensori: senza il loro stato
+        # la tabella userebbe il nome di ripiego e nessuna coordinata, con transizioni che dal vivo non avvengono
+        self.zones = configured_zones(data)
+        for entity_id, (_when, _entity_id, state, attributes) in first_zone_states(
+            args.input, self.zones, args.sensor or None, ordered=not args.sort
+        ).items():
+            self.hass.states.async_set(entity_id, state, attributes)
+        self.sensors = set(args.sensor) if args.sensor else None
+        self.trackers: Dict[str, ReplayTracker] = {}
+        self.transitions: List[Tuple[float, str, str, str]] = []
+        self.writes_per_hour: Counter = Counter()
+        self._last_state: Dict[str, str] = {}
+        # Person simulate: nome → sensori dei suoi tracker, e sensore → Person
+        self.persons: Dict[str, List[str]] = {}
+        self._sensor_persons: Dict[str, List[str]] = {}
+        for item in args.person:
+            name, _, sensors = item.partition("=")
+            self.persons[name] = sensors.split(",")
+            for sensor in self.persons[name]:
+                self._sensor_persons.setdefault(sensor, []).append(name)
+        self._person_state: Dict[str, str] = {}
+        self._tracker_changed: Dict[str, float] = {}
+
+    def _tracker(self, sensor: str) -> ReplayTracker:
+        tracker = self.trackers.get(sensor)
+        if tracker is None:
+            tracker = ReplayTracker(self.hass, sensor, self.consider_home, self.runtime, self.zone_table, self.flap_damping)
+            tracker.replay = self
+            self.trackers[sensor] = tracker
+            add_entity(tracker)
+        return tracker
+
+    def apply(self, row: Row) -> bool:
+        """Applica una riga dello storico; False se riguarda un'entità ignorata."""
+        when, entity_id, state, attributes = row
+        is_zone = entity_id.startswith("zone.")
+        if not is_zone:
+            if self.sensors is not None and entity_id not in self.sensors:
+                return False
+            if self.sensors is None and not is_wifi_sensor(entity_id):
+                return False
+        self.hass.advance_to(when)
+        if not is_zone and entity_id not in self.trackers:
+            # Il tracker nasce sul primo stato del sensore, come all'avvio dell'integrazione
+            self.hass.states.async_set(entity_id, state, attributes)
+            self._tracker(entity_id)
+            return True
+        self.hass.states.async_set(entity_id, state, attributes)
+        return True
+
+    def record_write(self, tracker: ReplayTracker) -> None:
+        now = self.hass.clock.now
+        self.writes_per_hour[int(now // 3600)] += 1
+        state = tracker.state
+        sensor = tracker._sensor
+        if self._last_state.get(sensor) == state:
+            return
+        self._last_state[sensor] = state
+        self._tracker_changed[sensor] = now
+        self.transitions.append((now, "tracker", tracker._attr_name, state))
+        for person in self._sensor_persons.get(sensor, ()):
+            self._update_person(person, now)
+
+    def _update_person(self, person: str, now: float) -> None:
+        """Person semplificata: a casa se un suo tracker è a casa, altrimenti lo stato del tracker cambiato per ultimo."""
+        states = [(self._tracker_changed.get(s, 0.0), self._last_state[s]) for s in self.persons[person] if s in self._last_state]
+        if not states:
+            return
+        state = "home" if any(s == "home" for _, s in states) else max(states)[1]
+        if self._person_state.get(person) != state:
+            self._person_state[person] = state
+            self.transitions.append((now, "person", person, state))
+
+
+def _sorted_rows(rows: Iterable[Row]) -> Iterator[Row]:
+    return iter(sorted(rows, key=lambda row: row[0]))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="Export CSV, file JSONL o copia del database SQLite del recorder")
+    parser.add_argument("--entry", help="File JSON con un config entry o il suo campo data; sostituisce le opzioni seguenti")
+    parser.add_argument("--home-ssid", help="SSID di casa")
+    parser.add_argument("--extra-home-ssid", action="append", default=[], help="SSID di casa aggiuntivo o pattern (ripetibile)")
+    parser.add_argument("--zone", action="append", default=[], help="SSID=zone.xxx (ripetibile)")
+    parser.add_argument("--bssid", action="append", default=[], help="BSSID o prefisso=zone.xxx (ripetibile)")
+    parser.add_argument("--ssid-rule", action="append", default=[], help="pattern o re:regex=zone.xxx (ripetibile)")
+    parser.add_argument("--ssid-normalize", action="store_true", help="Confronta gli SSID ignorando maiuscole e varianti Unicode")
+    parser.add_argument("--sensor", action="append", default=[], help="Sensore da riprodurre (ripetibile, default: tutti i sensori Wi-Fi)")
+    parser.add_argument("--person", action="append", default=[], help="nome=sensore1,sensore2 per simulare una Person (ripetibile)")
+    parser.add_argument("--consider-home", type=int, default=180, help="consider_home in secondi")
+    parser.add_argument("--flap-damping", type=int, default=0, help="Smorzamento dei cambi di zona in secondi")
+    parser.add_argument("--sort", action="store_true", help="Ordina le righe per tempo caricandole in memoria")
+    parser.add_argument("--transitions", help="File CSV in cui scrivere tutte le transizioni")
+    parser.add_argument("--output", default="replay_results.json", help="File JSON del riepilogo")
+    args = parser.parse_args(argv)
+
+    replay = Replay(args)
+    # Gli attributi dei sensori servono solo se la tabella segue il BSSID, quelli delle zone sempre
+    rows = read_rows(args.input, bool(replay.zone_table.watched_attributes), args.sensor or None)
+    if args.sort:
+        rows = _sorted_rows(rows)
+
+    CountingTracker.writes = 0
+    processed = skipped = out_of_order = 0
+    first = last = None
+    started = time.perf_counter()
+    for row in rows:
+        when = row[0]
+        if last is not None and when < last:
+            out_of_order += 1
+        if not replay.apply(row):
+            skipped += 1
+            continue
+        processed += 1
+        if first is None:
+            first = when
+        last = max(last, when) if last is not None else when
+    # Le uscite ancora in corso alla fine dello storico scadono comunque
+    if last is not None:
+        replay.hass.advance_to(last + max(replay.consider_home, replay.flap_damping) + 1)
+    elapsed = time.perf_counter() - started
+
+    hours = list(replay.writes_per_hour.values())
+    span_hours = ((last - first) / 3600) if first is not None and last is not None else 0.0
+    metrics = async_get_metrics(replay.hass)
+    report = {
+        "input": args.input,
+        "consider_home": replay.consider_home,
+        "flap_damping": replay.flap_damping,
+        "rows_processed": processed,
+        "rows_skipped": skipped,
+        "rows_out_of_order": out_of_order,
+        "trackers": len(replay.trackers),
+        "history_hours": round(span_hours, 2),
+        "elapsed_sec": round(elapsed, 3),
+        "rows_per_sec": round(processed / elapsed, 1) if elapsed else 0.0,
+        "speedup": round(span_hours * 3600 / elapsed, 1) if elapsed else 0.0,
+        "state_writes": CountingTracker.writes,
+        "state_writes_per_hour_mean": round(CountingTracker.writes / span_hours, 2) if span_hours else 0.0,
+        "state_writes_per_hour_max": max(hours, default=0),
+        "tracker_transitions": sum(1 for t in replay.transitions if t[1] == "tracker"),
+        "person_transitions": sum(1 for t in replay.transitions if t[1] == "person"),
+        "transitions_absorbed": metrics.transitions_absorbed,
+        "events_dropped": sum(metrics.sensor_events_dropped.values()),
+    }
+
+    if args.transitions:
+        with open(args.transitions, "w", newline="", encoding="utf-8") as fp:
+            writer = csv.writer(fp)
+            writer.writerow(["time", "kind", "entity", "state"])
+            for when, kind, entity, state in replay.transitions:
+                writer.writerow([datetime.fromtimestamp(when).astimezone().isoformat(), kind, entity, state])
+
+    with open(args.output, "w", encoding="utf-8") as fp:
+        json.dump(report, fp, indent=2)
+    for key, value in report.items():
+        print(f"{key:<28} {value}")
+    if out_of_order:
+        print(f"Warning: {out_of_order} rows were not in time order, rerun with --sort", file=sys.stderr)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
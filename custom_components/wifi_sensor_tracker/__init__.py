@@ -2,17 +2,25 @@
 import logging
 import voluptuous as vol
 from homeassistant.core import HomeAssistant, callback
-from homeassistant.const import __version__ as HA_VERSION
+from homeassistant.const import EVENT_SERVICE_REGISTERED, __version__ as HA_VERSION
 from packaging.version import parse as parse_version
-from homeassistant.config_entries import ConfigEntry
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
 from homeassistant.helpers import entity_registry as er
 import homeassistant.helpers.config_validation as cv
 import asyncio
+import time
 
 
 DOMAIN = "wifi_sensor_tracker"
 PLATFORMS = ["device_tracker"]
 MIN_HA_VERSION = "2026.07.0"
+# Versione dello schema dei config entry, allineata a WifiSensorTrackerConfigFlow.VERSION
+CONFIG_ENTRY_VERSION = 2
+
+# Richieste di posizione all'avvio: attesa massima dei servizi notify, chiamate parallele e timeout per chiamata
+LOCATION_REQUEST_MAX_WAIT = 30
+LOCATION_REQUEST_CONCURRENCY = 5
+LOCATION_REQUEST_TIMEOUT = 10
 
 
 CONFIG_SCHEMA = vol.Schema(
@@ -22,6 +30,7 @@ CONFIG_SCHEMA = vol.Schema(
                 vol.Optional("home_wifi_ssid"): cv.string,
                 vol.Optional("sensors"): [cv.entity_id],
                 vol.Optional("consider_home", default=180): cv.positive_int,
+                vol.Optional("flap_damping", default=0): cv.positive_int,
             }
         )
     },
@@ -43,12 +52,21 @@ async def async_setup(hass: HomeAssistant, config: dict):
         return False
 
     # Patch del componente Person per versioni del core in cui manca la priorità dei tracker stationary rispetto a quelli gps
+    # La patch viene preparata nell'executor e applicata solo quando una Person usa uno dei nostri tracker
     try:
-        from .patch_person import apply_person_patch
-        apply_person_patch()
+        from .patch_person import async_setup_person_patch
+        async_setup_person_patch(hass)
     except Exception as e:
         _LOGGER.warning("Patch Person: errore nell'importazione o applicazione: %s", e)
 
+    # Vista HTTP con le metriche interne in formato Prometheus
+    from .metrics import WifiSensorTrackerMetricsView
+    hass.http.register_view(WifiSensorTrackerMetricsView())
+
+    # Servizio di profilazione su richiesta dei callback dell'integrazione
+    from .profiler import async_setup_profile_service
+    async_setup_profile_service(hass)
+
     # YAML setup (legacy)
     if DOMAIN in config:
         # Se non esiste un entry lo creo e importo i dati esistenti
@@ -72,6 +90,87 @@ async def async_setup(hass: HomeAssistant, config: dict):
     return True
 
 
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Porta il config entry all'ultima versione dello schema; ogni migrazione viene eseguita una sola volta."""
+    if entry.version > CONFIG_ENTRY_VERSION:
+        # Entry creato da una versione più recente dell'integrazione
+        _LOGGER.error("Cannot downgrade config entry '%s' from version %s.", entry.title, entry.version)
+        return False
+
+    if entry.version == 1:
+        # Versione 1 → 2: la lista extra_zones di {ssid, zone} diventa la mappa ssid_zones SSID → entity_id della zona.
+        # Le zone salvate con il friendly name (configurazioni legacy) vengono convertite nel relativo entity_id se la zona esiste
+        friendly_to_entity = _zone_friendly_names(hass)
+        ssid_zones = {}
+        duplicates = set()
+        unresolved = set()
+        for z in entry.data.get("extra_zones", []):
+            ssid = (z.get("ssid") or "").strip()
+            zone_val = z.get("zone") or ""
+            if not ssid or not zone_val:
+                continue
+            if not zone_val.startswith("zone."):
+                # Le zone potrebbero non essere ancora caricate: il nome resta com'è e verrà risolto all'avvio
+                # (_async_resolve_legacy_zones), senza indovinare un entity_id che verrebbe salvato per sempre
+                if zone_val in friendly_to_entity:
+                    zone_val = friendly_to_entity[zone_val]
+                else:
+                    unresolved.add(zone_val)
+            if ssid in ssid_zones:
+                duplicates.add(ssid)
+            # Come nella versione 1, a parità di SSID vale l'ultima voce
+            ssid_zones[ssid] = zone_val
+
+        if duplicates:
+            _LOGGER.warning(
+                "Duplicate SSIDs found in configuration: %s. Only the last network/zone of each was kept.",
+                ", ".join(sorted(duplicates)),
+            )
+        if unresolved:
+            _LOGGER.warning(
+                "Zones %s of config entry '%s' could not be resolved to a zone entity yet. "
+                "They will be resolved when Home Assistant has started.",
+                ", ".join(sorted(unresolved)), entry.title,
+            )
+
+        data = {k: v for k, v in entry.data.items() if k != "extra_zones"}
+        data["ssid_zones"] = ssid_zones
+        hass.config_entries.async_update_entry(entry, data=data, version=2)
+        _LOGGER.debug("Config entry '%s' migrated to version 2.", entry.title)
+
+    return True
+
+
+def _zone_friendly_names(hass: HomeAssistant) -> dict:
+    """Mappa friendly name → entity_id delle zone esistenti."""
+    return {z.attributes.get("friendly_name", ""): z.entity_id for z in hass.states.async_all("zone")}
+
+
+async def _async_resolve_legacy_zones(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Converte nel relativo entity_id le zone salvate con il friendly name, solo quando la zona esiste davvero."""
+    ssid_zones = entry.data.get("ssid_zones", {})
+    legacy = {ssid: zone for ssid, zone in ssid_zones.items() if not zone.startswith("zone.")}
+    if not legacy:
+        return
+
+    friendly_to_entity = _zone_friendly_names(hass)
+    resolved = {ssid: friendly_to_entity[zone] for ssid, zone in legacy.items() if zone in friendly_to_entity}
+    unresolved = sorted({zone for ssid, zone in legacy.items() if ssid not in resolved})
+    if unresolved:
+        _LOGGER.warning(
+            "Zones %s are not the name of any existing zone. Select the zone again in the integration options.",
+            ", ".join(unresolved),
+        )
+    if not resolved:
+        return
+
+    for ssid, zone_entity_id in resolved.items():
+        _LOGGER.debug("Zone '%s' migrated to '%s' in the config entry", legacy[ssid], zone_entity_id)
+    hass.config_entries.async_update_entry(entry, data={**entry.data, "ssid_zones": {**ssid_zones, **resolved}})
+    # I tracker in esecuzione passano subito alla zona risolta
+    await async_apply_entry_changes(hass, entry)
+
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Configuro l'integrazione con i dati del config entry."""
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
@@ -88,13 +187,11 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 
 
 async def _initial_checks_and_update_request(hass: HomeAssistant, entry: ConfigEntry):
-    """Controlla i sensori, le zone e gli ssid configurate. Dopo 30s invia request_location_update ai dispositivi con app companion registrata"""
+    """Controlla i sensori, le zone e gli ssid configurate. Appena i servizi notify sono pronti invia request_location_update ai dispositivi dei sensori configurati"""
 
     # === CONTROLLO SENSORI ===
-    all_sensors = [e for e in hass.states.async_entity_ids("sensor")]
-    available_sensors = {
-        s for s in all_sensors if s.endswith("_wifi_connection") or s.endswith("_ssid") or s.endswith("_wi_fi_connection")
-    }
+    from .sensor_index import async_get_sensor_index
+    available_sensors = async_get_sensor_index(hass).sensors
     configured_sensors = set(entry.data.get("sensors", []))
     missing_sensors = configured_sensors - available_sensors
 
@@ -104,7 +201,11 @@ async def _initial_checks_and_update_request(hass: HomeAssistant, entry: ConfigE
             ", ".join(sorted(missing_sensors)),
         )
 
-    new_sensors = available_sensors - configured_sensors
+    # Un sensore già assegnato ad un'altra sede non è "nuovo"
+    all_configured_sensors = set().union(
+        *(e.data.get("sensors", []) for e in hass.config_entries.async_entries(DOMAIN))
+    )
+    new_sensors = available_sensors - all_configured_sensors
 
     if new_sensors:
         _LOGGER.info(
@@ -113,92 +214,135 @@ async def _initial_checks_and_update_request(hass: HomeAssistant, entry: ConfigE
         )
 
     # === CONTROLLO ZONE CONFIGURATE ===
-    extra_zones = entry.data.get("extra_zones", [])
-    if extra_zones:
-
-        # Ottieni tutte le zone esistenti in HA
-        ha_zone_states = hass.states.async_all("zone")
-        # Mapping friendly_name → entity_id
-        friendly_to_entity = {z.attributes.get("friendly_name", ""): z.entity_id for z in ha_zone_states}
-        # Set di entity_id esistenti
-        ha_entity_ids = {z.entity_id for z in ha_zone_states}
-
-        # Controllo / migrazione delle zone salvate nell'entry
-        updated = False
-        for z in extra_zones:
-            zone_val = z.get("zone", "")
-            # Se non è entity_id valido e corrisponde a friendly name, migra
-            if not zone_val.startswith("zone.") and zone_val in friendly_to_entity:
-                z["zone"] = friendly_to_entity[zone_val]
-                updated = True
-                _LOGGER.debug("Zone '%s' migrated to '%s' in the config entry", zone_val, z["zone"])
-
-        # Aggiorna entry solo se ci sono stati cambiamenti
-        if updated:
-            data = dict(entry.data)
-            data["extra_zones"] = extra_zones
-            hass.config_entries.async_update_entry(entry, data=data)
-            _LOGGER.debug("Legacy extra zones migration completed.")
-
-        # Controllo zone mancanti
-        configured_zones = {z["zone"] for z in extra_zones if "zone" in z}
-        missing_zones = configured_zones - ha_entity_ids
-        if missing_zones:
-            _LOGGER.warning(
-                "Some configured zones do not exist in Home Assistant: %s. "
-                "Create them in the map to allow the Person entity to display the correct zone.",
-                ", ".join(sorted(missing_zones)),
-            )
+    # SSID e zone sono già indicizzati e migrati (async_migrate_entry): restano i friendly name non ancora risolti
+    # alla migrazione, ora che le zone sono caricate, e la verifica delle zone mancanti
+    await _async_resolve_legacy_zones(hass, entry)
+    configured_zones = set(entry.data.get("ssid_zones", {}).values())
+    configured_zones.update(b["zone"] for b in entry.data.get("extra_bssids", []))
+    configured_zones.update(r["zone"] for r in entry.data.get("ssid_rules", []))
+    # I friendly name non risolti sono già stati segnalati da _async_resolve_legacy_zones
+    missing_zones = {z for z in configured_zones if z.startswith("zone.") and hass.states.get(z) is None}
+    if missing_zones:
+        _LOGGER.warning(
+            "Some configured zones do not exist in Home Assistant: %s. "
+            "Create them in the map to allow the Person entity to display the correct zone.",
+            ", ".join(sorted(missing_zones)),
+        )
 
+    # === INVIO request_location_update AI DISPOSITIVI DEI SENSORI CONFIGURATI ===
+    # Le richieste coprono i sensori di tutti gli entry: con più config entry avviati insieme ne basta un solo invio
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if domain_data.get("location_requests_running"):
+        _LOGGER.debug("Location update requests already in progress for another entry, skipping.")
+        return
+    domain_data["location_requests_running"] = True
+    try:
+        # Solo i dispositivi dietro ai nostri tracker: tablet, pannelli e telefoni senza sensore configurato restano fuori
+        targets = async_get_sensor_index(hass).async_notify_services(all_configured_sensors)
+        notify_services = await _async_wait_for_mobile_app_notify(hass, set(targets))
 
-    # === CONTROLLO SSID CONFIGURATI ===
-    extra_ssid = set()
-    duplicates = []
-    for z in entry.data.get("extra_zones", []):
-        ssid = z.get("ssid")
-        if ssid in extra_ssid:
-            duplicates.append(ssid)
+        if not notify_services:
+            _LOGGER.info("No devices with the Home Assistant Companion App providing compatible sensors were found.")
         else:
-            extra_ssid.add(ssid)
+            await _async_send_location_requests(hass, notify_services)
+    finally:
+        domain_data["location_requests_running"] = False
 
-    if duplicates:
-        _LOGGER.warning(
-            "Duplicate SSIDs found in configuration: %s. "
-            "This may cause unexpected behavior. Remove duplicate networks or zones from the integration options.",
-            ", ".join(sorted(set(duplicates))),
+
+def _registered_notify_services(hass: HomeAssistant, targets: set) -> list:
+    """Restituisce i servizi notify tra quelli indicati che risultano già registrati."""
+    return sorted(srv for srv in targets if hass.services.has_service("notify", srv))
+
+
+async def _async_wait_for_mobile_app_notify(hass: HomeAssistant, targets: set) -> list:
+    """Attende che i servizi notify dei dispositivi indicati siano registrati, al massimo LOCATION_REQUEST_MAX_WAIT secondi."""
+    services = _registered_notify_services(hass, targets)
+    if len(services) >= len(targets):
+        return services
+
+    ready = asyncio.Event()
+
+    @callback
+    def _service_filter(event_data) -> bool:
+        return event_data["domain"] == "notify" and event_data["service"] in targets
+
+    @callback
+    def _on_service_registered(event):
+        if len(_registered_notify_services(hass, targets)) >= len(targets):
+            ready.set()
+
+    unsub = hass.bus.async_listen(EVENT_SERVICE_REGISTERED, _on_service_registered, event_filter=_service_filter)
+    try:
+        async with asyncio.timeout(LOCATION_REQUEST_MAX_WAIT):
+            await ready.wait()
+    except TimeoutError:
+        _LOGGER.debug(
+            "Not all mobile_app notify services registered after %ss, sending location update requests to the available ones.",
+            LOCATION_REQUEST_MAX_WAIT,
         )
+    finally:
+        unsub()
+    return _registered_notify_services(hass, targets)
 
-    # === INVIO request_location_update AI DISPOSITIVI CON APP COMPANION REGISTRATI ===
-    await asyncio.sleep(30)
-    
-    notify_services = [
-        srv for srv in hass.services.async_services().get("notify", {}).keys()
-        if srv.startswith("mobile_app_")
-    ]
 
-    if not notify_services:
-        _LOGGER.info("No devices with the Home Assistant Companion App providing compatible sensors were found.")
-    else:
-        for srv in notify_services:
+async def _async_send_location_requests(hass: HomeAssistant, notify_services: list) -> None:
+    """Invia request_location_update in parallelo, con concorrenza limitata e timeout per singola chiamata."""
+    from .metrics import async_get_metrics
+    metrics = async_get_metrics(hass)
+    semaphore = asyncio.Semaphore(LOCATION_REQUEST_CONCURRENCY)
+    started = time.monotonic()
+
+    async def _send(srv) -> bool:
+        async with semaphore:
             _LOGGER.debug("Sending location update request to %s", srv)
             try:
-                await hass.services.async_call(
-                    "notify",
-                    srv,
-                    {"message": "request_location_update"},
-                    blocking=False,
-                )
+                async with asyncio.timeout(LOCATION_REQUEST_TIMEOUT):
+                    await hass.services.async_call(
+                        "notify",
+                        srv,
+                        {"message": "request_location_update"},
+                        blocking=True,
+                    )
+            except TimeoutError:
+                metrics.location_requests_failed += 1
+                _LOGGER.error("Timed out sending location update request to %s", srv)
+                return False
             except Exception as e:
+                metrics.location_requests_failed += 1
                 _LOGGER.error("Failed to send location update request to %s: %s", srv, e)
-        _LOGGER.debug("Sent location update requests to %d devices", len(notify_services))
+                return False
+            metrics.location_requests_sent += 1
+            return True
+
+    results = await asyncio.gather(*(_send(srv) for srv in notify_services))
+    succeeded = sum(results)
+    _LOGGER.debug(
+        "Location update requests: %d succeeded, %d failed, %.2fs elapsed",
+        succeeded, len(results) - succeeded, time.monotonic() - started,
+    )
 
 
 async def async_soft_reload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Soft reload: non elimina entità dal registry, solo ricarica la piattaforma."""
-    await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    await async_unload_entry(hass, entry)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
 
+async def async_apply_entry_changes(hass: HomeAssistant, entry: ConfigEntry):
+    """Applica le modifiche del config entry ai tracker in esecuzione, senza ricaricare la piattaforma.
+
+    Aggiunge o rimuove solo i tracker dei sensori cambiati e passa SSID, zone e tempi a quelli esistenti;
+    il soft reload resta solo per un entry la cui piattaforma non è attiva.
+    """
+    from .device_tracker import async_reconfigure_entry
+    if not async_reconfigure_entry(hass, entry) and entry.state is ConfigEntryState.LOADED:
+        await async_soft_reload_entry(hass, entry)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload config entry e rimuove le entità associate."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    unloaded = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    if unloaded:
+        from .runtime import async_get_runtime
+        async_get_runtime(hass).entries.pop(entry.entry_id, None)
+    return unloaded
@@ -0,0 +1,124 @@
+"""consider_home adattivo: ritardo di uscita appreso per tracker dalle pause di connessione concluse con una riconnessione."""
+from __future__ import annotations
+import asyncio
+import bisect
+import logging
+from typing import Any, Dict, List, Optional
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from . import DOMAIN
+
+_LOGGER = logging.getLogger(__package__)
+
+STORAGE_VERSION = 1
+# Secondi di attesa prima di salvare: più pause osservate in poco tempo producono una sola scrittura
+SAVE_DELAY = 60
+
+# Limiti del ritardo appreso; le pause più lunghe del massimo sono considerate uscite reali e non vengono osservate
+ADAPTIVE_MIN_DELAY = 30
+ADAPTIVE_MAX_DELAY = 900
+# Pause necessarie prima di sostituire il consider_home configurato
+MIN_GAPS = 10
+# Quantile delle pause coperto dal ritardo appreso, con un margine di sicurezza
+GAP_QUANTILE = 0.95
+SAFETY_MARGIN = 1.25
+# Peso residuo delle osservazioni precedenti ad ogni nuova pausa: le abitudini recenti contano di più (~50 pause)
+DECAY = 0.98
+
+# Istogramma a intervalli logaritmici da 1 s al massimo: risoluzione relativa costante (~15%) con 48 contatori
+_BINS = 48
+_EDGES: List[float] = [ADAPTIVE_MAX_DELAY ** ((i + 1) / _BINS) for i in range(_BINS)]
+
+
+class GapHistogram:
+    """Distribuzione delle pause di riconnessione con decadimento esponenziale.
+
+    Memoria e costo per osservazione sono costanti; il quantile è stimato per eccesso
+    (estremo superiore dell'intervallo), quindi il ritardo appreso non è mai più corto delle pause osservate.
+    """
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self, counts: Optional[List[float]] = None) -> None:
+        self.counts = list(counts) if counts and len(counts) == _BINS else [0.0] * _BINS
+        self.total = sum(self.counts)
+
+    def observe(self, gap: float) -> None:
+        counts = self.counts
+        for i in range(_BINS):
+            counts[i] *= DECAY
+        counts[min(bisect.bisect_left(_EDGES, gap), _BINS - 1)] += 1.0
+        self.total = self.total * DECAY + 1.0
+
+    def quantile(self, q: float) -> float:
+        target = self.total * q
+        cumulative = 0.0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return _EDGES[i]
+        return _EDGES[-1]
+
+
+class AdaptiveConsiderHome:
+    """Ritardi di uscita appresi per tracker (chiave: unique_id), persistiti in .storage."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._store: Optional[Store] = None
+        self._histograms: Dict[str, GapHistogram] = {}
+        self._gaps: Dict[str, int] = {}
+        self._delays: Dict[str, float] = {}
+        self._loading: Optional[asyncio.Task] = None
+        self.loaded = False
+
+    async def async_load(self) -> None:
+        """Carica i dati salvati; le chiamate successive attendono o ritornano subito."""
+        if self.loaded:
+            return
+        if self._loading is None:
+            self._loading = self.hass.async_create_task(self._async_load())
+        await self._loading
+
+    async def _async_load(self) -> None:
+        self._store = Store(self.hass, STORAGE_VERSION, f"{DOMAIN}.adaptive_consider_home")
+        data = await self._store.async_load() or {}
+        for key, item in data.items():
+            self._histograms[key] = GapHistogram(item.get("counts"))
+            self._gaps[key] = item.get("gaps", 0)
+            self._update_delay(key)
+        self.loaded = True
+        _LOGGER.debug("Adaptive consider_home loaded for %d trackers.", len(data))
+
+    def delay(self, key: str, default: float) -> float:
+        """Ritardo di uscita del tracker: quello appreso se ci sono abbastanza pause, altrimenti default."""
+        return self._delays.get(key, default)
+
+    def gaps(self, key: str) -> int:
+        """Pause di riconnessione osservate per il tracker."""
+        return self._gaps.get(key, 0)
+
+    def observe(self, key: str, gap: float) -> None:
+        """Registra una pausa conclusa con una riconnessione e aggiorna il ritardo appreso."""
+        if not self.loaded or gap > ADAPTIVE_MAX_DELAY:
+            return
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = GapHistogram()
+        histogram.observe(gap)
+        self._gaps[key] = self._gaps.get(key, 0) + 1
+        self._update_delay(key)
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    def _update_delay(self, key: str) -> None:
+        if self._gaps.get(key, 0) < MIN_GAPS:
+            self._delays.pop(key, None)
+            return
+        learned = self._histograms[key].quantile(GAP_QUANTILE) * SAFETY_MARGIN
+        self._delays[key] = round(min(max(learned, ADAPTIVE_MIN_DELAY), ADAPTIVE_MAX_DELAY))
+
+    def _data_to_save(self) -> Dict[str, Any]:
+        return {
+            key: {"counts": [round(c, 4) for c in histogram.counts], "gaps": self._gaps.get(key, 0)}
+            for key, histogram in self._histograms.items()
+        }
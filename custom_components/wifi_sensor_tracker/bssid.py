@@ -0,0 +1,78 @@
+"""Indice BSSID → zona con voci complete o per prefisso (OUI) e parsing della relativa configurazione."""
+from __future__ import annotations
+import string
+from typing import Dict, FrozenSet, List, Mapping, Optional, Tuple
+
+# Attributo del sensore Wi-Fi dell'App Companion con il BSSID dell'access point
+ATTR_BSSID = "bssid"
+
+# Un BSSID completo ha 12 cifre esadecimali; il prefisso più corto ammesso è un OUI (6 cifre, il produttore)
+BSSID_DIGITS = 12
+MIN_PREFIX_DIGITS = 6
+
+_HEX_DIGITS = frozenset(string.hexdigits.lower())
+_SEPARATORS = str.maketrans("", "", ":-. ")
+
+
+def normalize_bssid(value: str) -> Optional[str]:
+    """Riduce un BSSID o un prefisso a cifre esadecimali minuscole senza separatori; None se non valido."""
+    digits = value.translate(_SEPARATORS).lower()
+    if not MIN_PREFIX_DIGITS <= len(digits) <= BSSID_DIGITS or not _HEX_DIGITS.issuperset(digits):
+        return None
+    return digits
+
+
+class BssidIndex:
+    """Corrispondenza sul prefisso più lungo tra BSSID completi e prefissi di produttore.
+
+    Le voci sono raggruppate per lunghezza del prefisso in tabelle hash: una ricerca costa al massimo
+    una lookup per ogni lunghezza presente (7 al massimo), indipendentemente dal numero di voci.
+    """
+
+    def __init__(self, bssid_zone_map: Mapping[str, str]) -> None:
+        by_length: Dict[int, Dict[str, str]] = {}
+        for prefix, zone_entity_id in bssid_zone_map.items():
+            by_length.setdefault(len(prefix), {})[prefix] = zone_entity_id
+        # Dalla lunghezza maggiore alla minore: un BSSID completo vince sul prefisso del suo produttore
+        self._tables: Tuple[Tuple[int, Dict[str, str]], ...] = tuple(
+            sorted(by_length.items(), key=lambda item: item[0], reverse=True)
+        )
+        self.zones: FrozenSet[str] = frozenset(bssid_zone_map.values())
+
+    def __bool__(self) -> bool:
+        return bool(self._tables)
+
+    def lookup(self, bssid: str) -> Optional[str]:
+        """entity_id della zona associata al BSSID, None se nessuna voce corrisponde."""
+        digits = bssid.translate(_SEPARATORS).lower()
+        for length, table in self._tables:
+            zone_entity_id = table.get(digits[:length])
+            if zone_entity_id is not None:
+                return zone_entity_id
+        return None
+
+
+def parse_bssid_zones(text: str) -> Optional[List[Dict[str, str]]]:
+    """Converte le righe "BSSID o prefisso = zone.xxx" del flow in voci del config entry; None se una riga non è valida."""
+    entries: List[Dict[str, str]] = []
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        bssid, sep, zone_entity_id = line.partition("=")
+        normalized = normalize_bssid(bssid.strip())
+        zone_entity_id = zone_entity_id.strip()
+        if not sep or normalized is None or not zone_entity_id.startswith("zone."):
+            return None
+        entries.append({"bssid": normalized, "zone": zone_entity_id})
+    return entries
+
+
+def format_bssid_zones(entries: List[Dict[str, str]]) -> str:
+    """Righe modificabili nel flow a partire dalle voci salvate nel config entry."""
+    lines = []
+    for entry in entries:
+        digits = entry["bssid"]
+        prefix = ":".join(digits[i:i + 2] for i in range(0, len(digits), 2))
+        lines.append(f"{prefix} = {entry['zone']}")
+    return "\n".join(lines)
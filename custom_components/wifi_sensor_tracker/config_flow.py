@@ -1,29 +1,88 @@
 """Config flow for Wi-Fi Sensor Tracker (multi-step: home + optional extra SSID/Zone)."""
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.helpers.selector import selector, SelectSelector, SelectSelectorConfig
 from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers import area_registry as ar
-from . import DOMAIN, async_soft_reload_entry
+from . import CONFIG_ENTRY_VERSION, DOMAIN, async_apply_entry_changes
+from .bssid import format_bssid_zones, parse_bssid_zones
+from .sensor_index import async_get_sensor_index
+from .ssid_matcher import SsidMatcher, format_ssid_rules, parse_ssid_list, parse_ssid_rules
 
 
 # keys used in temporary storage
 _BASE = "base"
-_EXTRA_ZONES = "extra_zones"
+_SSID_ZONES = "ssid_zones"
 
 
 async def _get_wifi_sensors(hass) -> List[str]:
     """Restituisci la lista di sensori filtrati in base al nome"""
-    entity_reg = er.async_get(hass)
-    all_entities = [e.entity_id for e in entity_reg.entities.values() if e.entity_id.startswith("sensor.")]
-    wifi_sensors = [
-        eid for eid in all_entities
-        if "_wifi_connection" in eid or "_ssid" in eid or "_wi_fi_connection" in eid
-    ]
-    return sorted(wifi_sensors)
+    # L'indice condiviso è mantenuto aggiornato dagli eventi del registry, nessuna scansione ad ogni step
+    return async_get_sensor_index(hass).sorted()
+
+
+def _entry_title(home_ssid: str) -> str:
+    """Titolo del config entry: con più sedi configurate l'SSID di casa le distingue."""
+    return f"Wi-Fi Sensor Tracker ({home_ssid.strip()})"
+
+
+def _sensors_used_by_other_entries(hass, sensors, entry_id: Optional[str] = None) -> Set[str]:
+    """Sensori già assegnati ad un altro config entry: ogni sensore alimenta un solo tracker."""
+    used: Set[str] = set()
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if entry.entry_id != entry_id:
+            used.update(entry.data.get("sensors", []))
+    return used.intersection(sensors)
+
+
+def _ssid_used_by_other_entries(hass, ssid: str, entry_id: Optional[str] = None) -> bool:
+    """Indica se l'SSID è già la rete di casa di un altro config entry."""
+    return any(
+        entry.entry_id != entry_id and (entry.data.get("home_wifi_ssid") or "").strip() == ssid
+        for entry in hass.config_entries.async_entries(DOMAIN)
+    )
+
+
+def _validate_bssid_zones(hass, text: str):
+    """Voci BSSID → zona dal campo di testo del flow e chiave dell'eventuale errore."""
+    entries = parse_bssid_zones(text)
+    if entries is None:
+        return None, "invalid_bssid"
+    ha_zone_entity_ids = {state.entity_id for state in hass.states.async_all("zone")}
+    if any(entry["zone"] not in ha_zone_entity_ids for entry in entries):
+        return None, "invalid_zone"
+    return entries, None
+
+
+def _validate_ssid_rules(hass, home_text: str, rules_text: str, normalize: bool):
+    """SSID di casa aggiuntivi e regole SSID → zona dai campi di testo del flow, e chiave dell'eventuale errore."""
+    home_ssids = parse_ssid_list(home_text)
+    rules = parse_ssid_rules(rules_text)
+    if rules is None:
+        return None, None, "invalid_ssid_rule"
+    # Compila le regole come farà la tabella delle zone per scartare pattern e regex non validi
+    try:
+        SsidMatcher([(ssid, "") for ssid in home_ssids] + [(rule["pattern"], rule["zone"]) for rule in rules], normalize)
+    except ValueError:
+        return None, None, "invalid_ssid_rule"
+    ha_zone_entity_ids = {state.entity_id for state in hass.states.async_all("zone")}
+    if any(rule["zone"] not in ha_zone_entity_ids for rule in rules):
+        return None, None, "invalid_zone"
+    return home_ssids, rules, None
+
+
+def _multiline_selector():
+    """Campo di testo su più righe per le regole SSID/BSSID."""
+    return selector(
+        {
+            "text": {
+                "multiline": True,
+            }
+        }
+    )
 
 
 async def _get_zone_options(hass):
@@ -42,8 +101,8 @@ async def _format_extra_zones_preview(hass, extra_zones: List[Dict[str, str]]) -
     for z in extra_zones:
         if z.get("delete"):
             continue
-        ssid = z.get("ssid", "?")
-        zone_entity_id = z.get("zone", "?")
+        ssid = z["ssid"]
+        zone_entity_id = z["zone"]
         zone_state = hass.states.get(zone_entity_id)
         if zone_state:
             zone_label = zone_state.attributes.get("friendly_name", zone_entity_id)
@@ -56,12 +115,13 @@ async def _format_extra_zones_preview(hass, extra_zones: List[Dict[str, str]]) -
 class WifiSensorTrackerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Gestisci il config flow for Wi-Fi Sensor Tracker."""
 
-    VERSION = 1
+    # Versione 2: le reti extra sono una mappa SSID → zona (vedi async_migrate_entry)
+    VERSION = CONFIG_ENTRY_VERSION
 
     def __init__(self) -> None:
         """Inizializza il flow"""
         self._base_config: Dict[str, Any] = {}
-        self._extra_zones: List[Dict[str, str]] = []
+        self._ssid_zones: Dict[str, str] = {}
 
 
     async def async_step_import(self, import_config: dict) -> Dict[str, Any]:
@@ -79,6 +139,12 @@ class WifiSensorTrackerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         ssid_default = user_input.get("home_wifi_ssid") if user_input else ""
         sensors_default = user_input.get("sensors") if user_input else []
         consider_home_default = user_input.get("consider_home", 180) if user_input else 180
+        flap_damping_default = user_input.get("flap_damping", 0) if user_input else 0
+        adaptive_default = user_input.get("adaptive_consider_home", False) if user_input else False
+        bssid_zones_default = user_input.get("bssid_zones", "") if user_input else ""
+        home_ssids_default = user_input.get("home_ssid_patterns", "") if user_input else ""
+        ssid_rules_default = user_input.get("ssid_rules", "") if user_input else ""
+        ssid_normalize_default = user_input.get("ssid_normalize", False) if user_input else False
         add_zone_default = user_input.get("add_zone", False) if user_input else False
 
         schema = vol.Schema(
@@ -97,6 +163,12 @@ class WifiSensorTrackerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                     }
                 ),
                 vol.Optional("consider_home", description={"translation_key": "consider_home"}, default=consider_home_default): int,
+                vol.Optional("flap_damping", description={"translation_key": "flap_damping"}, default=flap_damping_default): vol.All(int, vol.Range(min=0)),
+                vol.Optional("adaptive_consider_home", description={"translation_key": "adaptive_consider_home"}, default=adaptive_default): bool,
+                vol.Optional("home_ssid_patterns", description={"translation_key": "home_ssid_patterns"}, default=home_ssids_default): _multiline_selector(),
+                vol.Optional("ssid_rules", description={"translation_key": "ssid_rules"}, default=ssid_rules_default): _multiline_selector(),
+                vol.Optional("ssid_normalize", description={"translation_key": "ssid_normalize"}, default=ssid_normalize_default): bool,
+                vol.Optional("bssid_zones", description={"translation_key": "bssid_zones"}, default=bssid_zones_default): _multiline_selector(),
                 vol.Optional("add_zone", description={"translation_key": "add_zone"}, default=add_zone_default): bool,
             }
         )
@@ -104,6 +176,11 @@ class WifiSensorTrackerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             ssid = (user_input.get("home_wifi_ssid") or "").strip()
             sensors = user_input.get("sensors", [])
+            extra_bssids, bssid_error = _validate_bssid_zones(self.hass, user_input.get("bssid_zones", ""))
+            ssid_normalize = user_input.get("ssid_normalize", False)
+            extra_home_ssids, ssid_rules, rules_error = _validate_ssid_rules(
+                self.hass, user_input.get("home_ssid_patterns", ""), user_input.get("ssid_rules", ""), ssid_normalize
+            )
 
             if not ssid:
                 errors["base"] = "missing_ssid"
@@ -111,15 +188,31 @@ class WifiSensorTrackerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 errors["base"] = "ssid_too_long"
             elif not sensors:
                 errors["base"] = "no_sensors"
+            # Ogni sede ha il proprio config entry: SSID di casa e sensori non possono essere condivisi
+            elif _ssid_used_by_other_entries(self.hass, ssid):
+                errors["base"] = "ssid_already_configured"
+            elif _sensors_used_by_other_entries(self.hass, sensors):
+                errors["base"] = "sensor_already_used"
+            elif bssid_error or rules_error:
+                errors["base"] = bssid_error or rules_error
             if errors:
                 return self.async_show_form(step_id="user", data_schema=schema, errors=errors)
 
             else:
+                await self.async_set_unique_id(ssid)
+                self._abort_if_unique_id_configured()
+
                 # Conservo in memoria l'attuale configurazone base
                 self._base_config = {
-                    "home_wifi_ssid": user_input["home_wifi_ssid"],
+                    "home_wifi_ssid": ssid,
                     "sensors": sensors,
                     "consider_home": user_input.get("consider_home", 180),
+                    "flap_damping": user_input.get("flap_damping", 0),
+                    "adaptive_consider_home": user_input.get("adaptive_consider_home", False),
+                    "extra_bssids": extra_bssids,
+                    "extra_home_ssids": extra_home_ssids,
+                    "ssid_rules": ssid_rules,
+                    "ssid_normalize": ssid_normalize,
                 }
 
                 add_zone = user_input.get("add_zone", False)
@@ -129,9 +222,9 @@ class WifiSensorTrackerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
                 # Non è stato selezionato il tasto per aggiungere reti extra, salva tutto e termina
                 data = dict(self._base_config)
-                # Se non è stata configurata alcuna rete extra, crea una lista vuota
-                data["extra_zones"] = list(self._extra_zones)
-                return self.async_create_entry(title="Wi-Fi Sensor Tracker", data=data)
+                # Se non è stata configurata alcuna rete extra, crea una mappa vuota
+                data[_SSID_ZONES] = dict(self._ssid_zones)
+                return self.async_create_entry(title=_entry_title(data["home_wifi_ssid"]), data=data)
 
         return self.async_show_form(step_id="user", data_schema=schema, errors=errors)
 
@@ -175,8 +268,8 @@ class WifiSensorTrackerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             # Schermata nuova rete, nessun ssid e zona inseriti, salva tutto e chiudi
             if not ssid_zone and not zone_entity_id:
                 data = dict(self._base_config)
-                data["extra_zones"] = list(self._extra_zones)
-                return self.async_create_entry(title="Wi-Fi Sensor Tracker", data=data)
+                data[_SSID_ZONES] = dict(self._ssid_zones)
+                return self.async_create_entry(title=_entry_title(data["home_wifi_ssid"]), data=data)
 
             # Se uno è compilato e l'altro no, restituisci errore
             if (not ssid_zone and zone_entity_id) or (ssid_zone and not zone_entity_id):
@@ -191,17 +284,14 @@ class WifiSensorTrackerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 errors["base"] = "ssid_too_long"
                 return self.async_show_form(step_id="add_zones", data_schema=schema, errors=errors)
 
-            # Recupero SSID principale della configurazione base e le altre eventuali reti per le zone extra già salvate
+            # Evita di inserire un SSID già configurato, di casa o di una rete extra (case-sensitive, come da standard Wi-Fi)
             home_ssid = self._base_config.get("home_wifi_ssid", "").strip()
-            existing_ssids = [home_ssid] + [z["ssid"].strip() for z in self._extra_zones]
-
-            # Evita di inserire un SSID già configurato (case-sensitive, come da standard Wi-Fi)
-            if ssid_zone in existing_ssids:
+            if ssid_zone == home_ssid or ssid_zone in self._ssid_zones:
                 errors["base"] = "ssid_already_exists"
                 return self.async_show_form(step_id="add_zones", data_schema=schema, errors=errors)
 
             # Se entrambi i campi sono compilati correttamente, memorizza la rete
-            self._extra_zones.append({"ssid": ssid_zone, "zone": zone_entity_id})
+            self._ssid_zones[ssid_zone] = zone_entity_id
 
             if add_another:
                 # Mostra un'altro step vuoto
@@ -209,8 +299,8 @@ class WifiSensorTrackerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
             # Salva tutti i dati nel config entry
             data = dict(self._base_config)
-            data["extra_zones"] = list(self._extra_zones)
-            return self.async_create_entry(title="Wi-Fi Sensor Tracker", data=data)
+            data[_SSID_ZONES] = dict(self._ssid_zones)
+            return self.async_create_entry(title=_entry_title(data["home_wifi_ssid"]), data=data)
 
         return self.async_show_form(step_id="add_zones", data_schema=schema, errors=errors)
 
@@ -230,14 +320,33 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
 
     def __init__(self, entry: config_entries.ConfigEntry) -> None:
         self._entry = entry
-        self._zones_to_edit: List[Dict[str, str]] = list(self._entry.data.get("extra_zones", []))
-        # Pulisce flag "delete" lasciati da un eventual flow interrotto
-        for z in self._zones_to_edit:
-            if "delete" in z:
-                z.pop("delete", None)
+        # Le reti vengono mostrate una per pagina: copia ordinata della mappa SSID → zona dell'entry
+        self._zones_to_edit: List[Dict[str, str]] = [
+            {"ssid": ssid, "zone": zone_entity_id} for ssid, zone_entity_id in entry.data.get(_SSID_ZONES, {}).items()
+        ]
+        # SSID → posizione in _zones_to_edit delle reti non eliminate, per i controlli sui duplicati
+        self._ssid_positions: Dict[str, int] = {z["ssid"]: i for i, z in enumerate(self._zones_to_edit)}
         self._current_index = 0
 
 
+    def _ssid_taken(self, ssid: str, index: Optional[int] = None) -> bool:
+        """Indica se l'SSID è quello di casa o di una rete extra diversa da quella in posizione index."""
+        position = self._ssid_positions.get(ssid)
+        return ssid == self._base_data.get("home_wifi_ssid", "").strip() or (position is not None and position != index)
+
+    def _ssid_zones_data(self) -> Dict[str, str]:
+        """Mappa SSID → zona da salvare, senza le reti eliminate."""
+        return {z["ssid"]: z["zone"] for z in self._zones_to_edit if not z.get("delete")}
+
+    @callback
+    def _async_update_entry(self, data: Dict[str, Any]) -> None:
+        """Salva i dati nel config entry allineando titolo e unique_id all'SSID di casa."""
+        ssid = data["home_wifi_ssid"]
+        self.hass.config_entries.async_update_entry(
+            self._entry, data=data, title=_entry_title(ssid), unique_id=ssid.strip()
+        )
+
+
     async def async_step_init(self, user_input: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Step principale di modifica base."""
         errors: Dict[str, str] = {}
@@ -268,6 +377,36 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
                     description={"translation_key": "consider_home"},
                     default=self._entry.data.get("consider_home", 180),
                 ): int,
+                vol.Optional(
+                    "flap_damping",
+                    description={"translation_key": "flap_damping"},
+                    default=self._entry.data.get("flap_damping", 0),
+                ): vol.All(int, vol.Range(min=0)),
+                vol.Optional(
+                    "adaptive_consider_home",
+                    description={"translation_key": "adaptive_consider_home"},
+                    default=self._entry.data.get("adaptive_consider_home", False),
+                ): bool,
+                vol.Optional(
+                    "home_ssid_patterns",
+                    description={"translation_key": "home_ssid_patterns"},
+                    default="\n".join(self._entry.data.get("extra_home_ssids", [])),
+                ): _multiline_selector(),
+                vol.Optional(
+                    "ssid_rules",
+                    description={"translation_key": "ssid_rules"},
+                    default=format_ssid_rules(self._entry.data.get("ssid_rules", [])),
+                ): _multiline_selector(),
+                vol.Optional(
+                    "ssid_normalize",
+                    description={"translation_key": "ssid_normalize"},
+                    default=self._entry.data.get("ssid_normalize", False),
+                ): bool,
+                vol.Optional(
+                    "bssid_zones",
+                    description={"translation_key": "bssid_zones"},
+                    default=format_bssid_zones(self._entry.data.get("extra_bssids", [])),
+                ): _multiline_selector(),
                 # Mostra una lista delle zone aggiuntive già memorizzate
                 vol.Optional(
                     "extra_zones_preview",
@@ -297,45 +436,46 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
         )
 
         if user_input is not None:
-            # Valida e calcola differenze 
+            # Valida i dati; le differenze con la configurazione attuale sono calcolate al salvataggio
             new_ssid = (user_input.get("home_wifi_ssid") or "").strip()
             new_sensors = set(user_input.get("sensors", []))
             new_consider_home = user_input.get("consider_home", 180)
+            new_flap_damping = user_input.get("flap_damping", 0)
+            new_adaptive = user_input.get("adaptive_consider_home", False)
+            new_bssids, bssid_error = _validate_bssid_zones(self.hass, user_input.get("bssid_zones", ""))
+            new_normalize = user_input.get("ssid_normalize", False)
+            new_home_ssids, new_rules, rules_error = _validate_ssid_rules(
+                self.hass, user_input.get("home_ssid_patterns", ""), user_input.get("ssid_rules", ""), new_normalize
+            )
             action = user_input.get("zone_action", "none")
 
-            old_ssid = self._entry.data.get("home_wifi_ssid")
-            old_sensors = set(self._entry.data.get("sensors", []))
-            old_consider_home = self._entry.data.get("consider_home", 180)
-
             if not new_ssid:
                 errors["base"] = "missing_ssid"
             elif len(new_ssid.encode("utf-8")) > 32:
                 errors["base"] = "ssid_too_long"
             elif not new_sensors:
                 errors["base"] = "no_sensors"
+            elif _ssid_used_by_other_entries(self.hass, new_ssid, self._entry.entry_id):
+                errors["base"] = "ssid_already_configured"
+            elif _sensors_used_by_other_entries(self.hass, new_sensors, self._entry.entry_id):
+                errors["base"] = "sensor_already_used"
+            elif bssid_error or rules_error:
+                errors["base"] = bssid_error or rules_error
             if errors:
                 return self.async_show_form(step_id="init", data_schema=schema, errors=errors)
 
             else:
-                sensors_to_add = new_sensors - old_sensors
-                sensors_to_remove = old_sensors - new_sensors
-                ssid_changed = new_ssid != old_ssid
-                consider_home_changed = new_consider_home != old_consider_home
-
-                # Rimuove le entità dei tracker legati ad eventuali sensori eliminati
-                if sensors_to_remove:
-                    entity_registry = er.async_get(self.hass)
-                    for sensor in sensors_to_remove:
-                        entity_id = f"device_tracker.{sensor.replace('sensor.', '').replace('.', '_').replace('_connection', '')}"
-                        entry = entity_registry.async_get(entity_id)
-                        if entry:
-                            entity_registry.async_remove(entry.entity_id)
-
                 # Conserva temporaneamente i dati in memoria
                 self._base_data = {
                     "home_wifi_ssid": new_ssid,
                     "sensors": list(new_sensors),
                     "consider_home": new_consider_home,
+                    "flap_damping": new_flap_damping,
+                    "adaptive_consider_home": new_adaptive,
+                    "extra_bssids": new_bssids,
+                    "extra_home_ssids": new_home_ssids,
+                    "ssid_rules": new_rules,
+                    "ssid_normalize": new_normalize,
                 }
 
                 # Verifica se l'utente ha scelto di gestire le reti extra
@@ -349,12 +489,11 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
 
                 # Se invece non deve gestire zone, salva la configurazione attuale nel config entry
                 data = dict(self._base_data)
-                data["extra_zones"] = list(self._zones_to_edit)
-                self.hass.config_entries.async_update_entry(self._entry, data=data)
+                data[_SSID_ZONES] = self._ssid_zones_data()
+                self._async_update_entry(data)
 
-                # Se sono state fatte modifiche, ricarica l'integrazione
-                if sensors_to_add or sensors_to_remove or ssid_changed or consider_home_changed:
-                    await async_soft_reload_entry(self.hass, self._entry)
+                # Applica ai tracker in esecuzione solo le differenze rispetto alla configurazione attuale
+                await async_apply_entry_changes(self.hass, self._entry)
 
                 return self.async_create_entry(title="", data={})
 
@@ -376,10 +515,9 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
             if getattr(self, "_mode", "manage") == "manage":
                 # Modalità modifica: abbiamo finito di scorrere le reti, salva tutto
                 data = dict(self._base_data)
-                cleaned = [{"ssid": z["ssid"], "zone": z["zone"]} for z in self._zones_to_edit if not z.get("delete")]
-                data["extra_zones"] = cleaned
-                self.hass.config_entries.async_update_entry(self._entry, data=data)
-                await async_soft_reload_entry(self.hass, self._entry)
+                data[_SSID_ZONES] = self._ssid_zones_data()
+                self._async_update_entry(data)
+                await async_apply_entry_changes(self.hass, self._entry)
                 return self.async_create_entry(title="", data={})
             else:
                 # Modalità aggiunta, mostriamo form vuoto
@@ -411,10 +549,9 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
                     if not ssid_zone and not zone_entity_id:
                         # Schermata nuova rete, nessuna nuova rete ed ssid inseriti, salva tutto e chiudi
                         data = dict(self._base_data)
-                        cleaned = [{"ssid": z["ssid"], "zone": z["zone"]} for z in self._zones_to_edit if not z.get("delete")]
-                        data["extra_zones"] = cleaned
-                        self.hass.config_entries.async_update_entry(self._entry, data=data)
-                        await async_soft_reload_entry(self.hass, self._entry)
+                        data[_SSID_ZONES] = self._ssid_zones_data()
+                        self._async_update_entry(data)
+                        await async_apply_entry_changes(self.hass, self._entry)
                         return self.async_create_entry(title="", data={})
 
                     # Se uno è compilato e l'altro no, restituisci errore
@@ -430,16 +567,8 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
                         errors["base"] = "ssid_too_long"
                         return self.async_show_form(step_id="edit_zones", data_schema=schema, errors=errors)
 
-                    # Recupero SSID principale della configurazione base e le altre eventuali reti per le zone extra già salvate
-                    home_ssid = self._base_data.get("home_wifi_ssid", "").strip()
-                    existing_ssids = [home_ssid] + [
-                        z["ssid"].strip()
-                        for z in self._zones_to_edit
-                        if not z.get("delete")
-                    ]
-
                     # Evita di inserire un SSID già configurato (case-sensitive, come da standard Wi-Fi)
-                    if ssid_zone in existing_ssids:
+                    if self._ssid_taken(ssid_zone):
                         errors["base"] = "ssid_already_exists"
                         return self.async_show_form(step_id="edit_zones", data_schema=schema, errors=errors)
 
@@ -451,6 +580,7 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
                         return self.async_show_form(step_id="edit_zones", data_schema=schema, errors=errors)
 
                     # Se entrambi i campi sono compilati correttamente, memorizza la rete
+                    self._ssid_positions[ssid_zone] = len(self._zones_to_edit)
                     self._zones_to_edit.append({"ssid": ssid_zone, "zone": zone_entity_id})
                     if add_another:
                         self._current_index = len(self._zones_to_edit)
@@ -458,10 +588,9 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
 
                     # Non è stato selezionato il tasto aggiunti altra rete, salva tutto e termina
                     data = dict(self._base_data)
-                    cleaned = [{"ssid": z["ssid"], "zone": z["zone"]} for z in self._zones_to_edit if not z.get("delete")]
-                    data["extra_zones"] = cleaned
-                    self.hass.config_entries.async_update_entry(self._entry, data=data)
-                    await async_soft_reload_entry(self.hass, self._entry)
+                    data[_SSID_ZONES] = self._ssid_zones_data()
+                    self._async_update_entry(data)
+                    await async_apply_entry_changes(self.hass, self._entry)
                     return self.async_create_entry(title="", data={})
 
                 return self.async_show_form(step_id="edit_zones", data_schema=schema, errors=errors)
@@ -500,6 +629,7 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
         if user_input is not None:
             if user_input.get("delete"):
                 self._zones_to_edit[self._current_index]["delete"] = True
+                self._ssid_positions.pop(current["ssid"], None)
             else:
                 ssid_zone = (user_input.get("ssid_zone") or "").strip()
                 zone_entity_id = (user_input.get("zone_name") or "").strip()
@@ -517,15 +647,8 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
                     errors["base"] = "ssid_too_long"
                     return self.async_show_form(step_id="edit_zones", data_schema=schema, errors=errors)
 
-                # Recupero SSID principale della configurazione base e le altre eventuali reti per le zone extra già salvate
-                home_ssid = self._base_data.get("home_wifi_ssid", "").strip()
-                existing_ssids = [home_ssid] + [
-                    z["ssid"].strip() for i, z in enumerate(self._zones_to_edit)
-                    if i != self._current_index and not z.get("delete")
-                ]
-
                 # Evita di inserire un SSID già configurato (case-sensitive, come da standard Wi-Fi)
-                if ssid_zone in existing_ssids:
+                if self._ssid_taken(ssid_zone, self._current_index):
                     errors["base"] = "ssid_already_exists"
                     return self.async_show_form(step_id="edit_zones", data_schema=schema, errors=errors)
 
@@ -537,7 +660,10 @@ class WifiSensorTrackerOptionsFlowHandler(config_entries.OptionsFlow):
                     return self.async_show_form(step_id="edit_zones", data_schema=schema, errors=errors)
 
                 # Se entrambi i campi sono compilati correttamente, memorizza la rete
-                self._zones_to_edit[self._current_index].update({"ssid": ssid_zone, "zone": zone_entity_id})
+                if self._ssid_positions.get(current["ssid"]) == self._current_index:
+                    del self._ssid_positions[current["ssid"]]
+                self._ssid_positions[ssid_zone] = self._current_index
+                current.update({"ssid": ssid_zone, "zone": zone_entity_id})
 
             self._current_index += 1
             return await self.async_step_edit_zones()
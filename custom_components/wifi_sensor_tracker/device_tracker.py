@@ -1,70 +1,183 @@
 """Device tracker per Wi-Fi Sensor Tracker (multi-zona, con consider_home)."""
 import logging
-from datetime import timedelta
+import math
+import time
 from homeassistant.components.device_tracker import SourceType, TrackerEntity, ScannerEntity
-from homeassistant.const import STATE_UNAVAILABLE, STATE_HOME, STATE_NOT_HOME, ATTR_FRIENDLY_NAME
-from homeassistant.components.zone import ENTITY_ID_HOME
+from homeassistant.const import STATE_UNAVAILABLE, STATE_NOT_HOME
 from homeassistant.core import callback
-from homeassistant.helpers.event import async_track_state_change_event, async_call_later
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.restore_state import ExtraStoredData, RestoredExtraData, RestoreEntity
 from homeassistant.util import dt as dt_util
-from .patch_person import WORKAROUND_HIDE_GPS_ACCURACY
+from . import DOMAIN
+from .bssid import ATTR_BSSID
+from .runtime import async_get_runtime
+from .state_store import NO_DEADLINE, NO_ZONE
+from .zones import ZoneTable, zone_from_state
+from . import patch_person
 
 _LOGGER = logging.getLogger(__package__)
 
 
+def tracker_unique_id(sensor: str) -> str:
+    """unique_id (e nome) del tracker derivato dal sensore che lo alimenta."""
+    return sensor.replace("sensor.", "").replace(".", "_").replace("_connection", "")
+
+
+def _entry_options(entry):
+    """Parametri del config entry usati dai tracker: opzioni della tabella delle zone, consider_home, smorzamento e consider_home adattivo."""
+    table_options = {
+        "ssid_home": entry.data["home_wifi_ssid"],
+        # Mappa SSID → entity_id della zona, memorizzata già indicizzata nel config entry
+        "ssid_zone_map": dict(entry.data.get("ssid_zones", {})),
+        # Mappa BSSID (o prefisso normalizzato) → entity_id della zona
+        "bssid_zone_map": {b["bssid"]: b["zone"] for b in entry.data.get("extra_bssids", [])},
+        # SSID di casa aggiuntivi e regole con caratteri jolly o regex
+        "home_ssids": tuple(entry.data.get("extra_home_ssids", [])),
+        "ssid_rules": tuple(entry.data.get("ssid_rules", [])),
+        "normalize": entry.data.get("ssid_normalize", False),
+    }
+    return (
+        table_options,
+        entry.data.get("consider_home", 180),
+        entry.data.get("flap_damping", 0),
+        entry.data.get("adaptive_consider_home", False),
+    )
+
+
 async def async_setup_entry(hass, entry, async_add_entities):
     """Crea le entità tracker dai sensori selezionati nel config entry."""
-    ssid_home = entry.data["home_wifi_ssid"]
-    sensors = entry.data["sensors"]
-    consider_home = entry.data.get("consider_home", 180)
-    extra_zones = entry.data.get("extra_zones", [])
-    
-    # Mappa SSID → entity_id della zona come memorizzato nel config entry
-    ssid_zone_map = {z["ssid"]: z["zone"] for z in extra_zones if "ssid" in z and "zone" in z}
-
-    entities = [
-        WifiSensorTrackerEntity(hass, sensor, ssid_home, ssid_zone_map, consider_home)
-        for sensor in sensors
-    ]
-
-    async_add_entities(entities)
-
-class WifiSensorTrackerEntity(ScannerEntity):
+    # Dispatcher, cache delle zone, scheduler e store sono condivisi da tutti i config entry
+    runtime = async_get_runtime(hass)
+    trackers = runtime.entries[entry.entry_id] = EntryTrackers(hass, runtime, entry, async_add_entities)
+    trackers.async_add_sensors(entry.data["sensors"])
+
+
+@callback
+def async_reconfigure_entry(hass, entry) -> bool:
+    """Applica le modifiche del config entry ai tracker in esecuzione; False se la piattaforma non è attiva."""
+    trackers = async_get_runtime(hass).entries.get(entry.entry_id)
+    if trackers is None:
+        return False
+    trackers.async_reconfigure(entry)
+    return True
+
+
+class EntryTrackers:
+    """Tracker e tabella SSID → zona di un config entry, riconfigurabili senza ricaricare la piattaforma."""
+
+    def __init__(self, hass, runtime, entry, async_add_entities):
+        self.hass = hass
+        self._runtime = runtime
+        self._async_add_entities = async_add_entities
+        self._options = _entry_options(entry)
+        # Tabella SSID/BSSID → zona di questo entry, risolta una sola volta e aggiornata solo quando cambia una zona configurata
+        self.zone_table = ZoneTable(runtime.zone_cache, **self._options[0])
+        self.entities = {}
+
+    @callback
+    def async_add_sensors(self, sensors):
+        """Crea e aggiunge i tracker per i sensori indicati."""
+        _, consider_home, flap_damping, adaptive = self._options
+        new_entities = []
+        for sensor in sensors:
+            entity = WifiSensorTrackerEntity(
+                self.hass, sensor, consider_home, self._runtime, self.zone_table, flap_damping, adaptive
+            )
+            self.entities[sensor] = entity
+            new_entities.append(entity)
+        if new_entities:
+            self._async_add_entities(new_entities)
+
+    @callback
+    def async_reconfigure(self, entry):
+        """Confronta il config entry con quello applicato e aggiorna solo ciò che è cambiato."""
+        old_sensors = set(self.entities)
+        new_sensors = set(entry.data["sensors"])
+        old_options, self._options = self._options, _entry_options(entry)
+        table_options, consider_home, flap_damping, adaptive = self._options
+
+        # Sensori rimossi: l'eliminazione dal registry rimuove anche l'entità dalla piattaforma
+        removed = old_sensors - new_sensors
+        if removed:
+            entity_registry = er.async_get(self.hass)
+            for sensor in removed:
+                entity = self.entities.pop(sensor)
+                entity_id = entity_registry.async_get_entity_id("device_tracker", DOMAIN, entity.unique_id)
+                if entity_id:
+                    entity_registry.async_remove(entity_id)
+                else:
+                    self.hass.async_create_task(entity.async_remove())
+
+        # Nuove reti o parametri: i tracker esistenti li ricevono al volo e rivalutano il sensore;
+        # lo stato viene riscritto solo se cambia davvero
+        if self._options != old_options:
+            if old_options[0] != table_options:
+                self.zone_table.async_update(**table_options)
+            for entity in self.entities.values():
+                entity.async_reconfigure(consider_home, flap_damping, adaptive)
+
+        self.async_add_sensors(sorted(new_sensors - old_sensors))
+        _LOGGER.debug(
+            "Entry %s reconfigured: %d trackers added, %d removed, options %s.",
+            entry.entry_id, len(new_sensors - old_sensors), len(removed),
+            "changed" if self._options != old_options else "unchanged",
+        )
+
+
+class WifiSensorTrackerEntity(ScannerEntity, RestoreEntity):
 #class WifiSensorTrackerEntity(TrackerEntity):
     """Rappresentazione di un tracker Wi-Fi basato su sensore."""
 
-    def __init__(self, hass, sensor, ssid_home, ssid_zone_map, consider_home):
+    # Attributi derivati dalla zona: servono a Person dalla state machine ma non vanno salvati in ogni riga del recorder
+    _unrecorded_attributes = frozenset({
+        "zone_entity_id", "latitude", "longitude", "gps_accuracy", "adaptive_consider_home", "reconnect_gaps",
+    })
+
+    # Se la patch del core non è stata applicata gps_accuracy resta None per evitare che il core mostri questo attributo con valore 0
+    _attr_gps_accuracy = None
+    _attr_should_poll = False
+
+    def __init__(self, hass, sensor, consider_home, runtime, zone_table, flap_damping=0, adaptive=False):
         self.hass = hass
         self._sensor = sensor
-        self._ssid_home = ssid_home
-        self._attr_name = sensor.replace("sensor.", "").replace(".", "_").replace("_connection", "")
-        self._attr_unique_id = sensor.replace("sensor.", "").replace(".", "_").replace("_connection", "")
-        self._attr_should_poll = False
-        self._attr_is_connected = False
-        self._attr_zone_entity_id = None
-        self._attr_latitude = None
-        self._attr_longitude = None
-        # Se la patch del core non è stata applicata inizializziamo gps_accuracy a None per evitare che il core mostri questo attributo con valore 0
-        if WORKAROUND_HIDE_GPS_ACCURACY:
-            self._attr_gps_accuracy = None
-        self._ssid_zone_map = ssid_zone_map or {}
-        self._current_zone = STATE_NOT_HOME
-        self._consider_home = timedelta(seconds=consider_home)
-        self._remove_listener = None
-        self._exit_timer = None  # inizializza il timer
+        self._zone_table = zone_table
+        # Dispatcher, scheduler, cache delle zone, store e metriche sono raggiunti tramite il runtime condiviso
+        self._runtime = runtime
+        self._attr_name = tracker_unique_id(sensor)
+        self._attr_unique_id = tracker_unique_id(sensor)
+        # Lo stato runtime (zona, connessione, scadenze, contatori) vive nelle colonne dello store condiviso:
+        # l'entità conserva solo il proprio slot, assegnato quando viene aggiunta. Lo slot è anche la chiave
+        # dello scheduler per l'uscita consider_home, il suo complemento quella del cambio di zona smorzato
+        self._slot = None
+        self._consider_home = consider_home
+        # Smorzamento dei cambi di zona: secondi di stabilità richiesti prima di confermarli (0 = disattivato)
+        self._flap_damping = flap_damping
+        # consider_home appreso dalle pause di riconnessione del dispositivo invece di quello fisso dell'entry
+        self._adaptive = adaptive
+        # True dopo il ripristino dello stato finché il sensore non torna disponibile
+        self._awaiting_sensor = False
+        # True durante la rivalutazione dovuta a una riconfigurazione: le scritture evitate non sono eventi del sensore
+        self._reconfiguring = False
 
     @property
     def source_type(self) -> SourceType:
         return SourceType.ROUTER
 
+    # Prima di async_added_to_hass e dopo la rimozione l'entità non ha uno slot nello store, ma Home Assistant
+    # può comunque leggerne le proprietà (aggiornamenti del registry, diagnostica): stato sconosciuto e nessun attributo
+
     @property
     def state(self):
-        return self._current_zone if self._attr_is_connected else STATE_NOT_HOME
+        slot = self._slot
+        if slot is None:
+            return None
+        store = self._runtime.state_store
+        return store.zone_of(slot).state if store.connected[slot] else STATE_NOT_HOME
 
     @property
     def is_connected(self) -> bool:
         """Return True if the device is connected."""
-        return self._attr_is_connected
+        return self._slot is not None and bool(self._runtime.state_store.connected[self._slot])
 
     @property
     def unique_id(self) -> str:
@@ -73,122 +186,302 @@ class WifiSensorTrackerEntity(ScannerEntity):
     @property
     def extra_state_attributes(self):
         """Attributi personalizzati per il tracker Wi-Fi."""
-        attrs = {}
-        if self._attr_zone_entity_id is not None:
-            attrs["zone_entity_id"] = self._attr_zone_entity_id
-        if self._attr_latitude is not None and self._attr_longitude is not None:
-            attrs["latitude"] = self._attr_latitude
-            attrs["longitude"] = self._attr_longitude
+        if self._slot is None:
+            return None
+        # Payload precalcolato per la zona attuale e condiviso con gli altri tracker nella stessa zona
+        attributes = self._runtime.state_store.zone_of(self._slot).attributes
+        if self._adaptive:
+            # Ritardo di uscita in uso e pause da cui è stato appreso: solo per i tracker adattivi, che pagano la copia
+            attributes = {
+                **attributes,
+                "adaptive_consider_home": self._exit_delay(),
+                "reconnect_gaps": self._runtime.adaptive.gaps(self._attr_unique_id),
+            }
         # Se la patch del core non è stata applicata forzo l'attributo a 'None' che diventerà 'null' in Json e non verrà mostrato nella UI
-        if WORKAROUND_HIDE_GPS_ACCURACY:
-            attrs["gps_accuracy"] = self._attr_gps_accuracy
-        return attrs
+        # Letto a runtime perché la patch può essere applicata dopo la creazione dei tracker
+        if patch_person.WORKAROUND_HIDE_GPS_ACCURACY:
+            return {**attributes, "gps_accuracy": self._attr_gps_accuracy}
+        return attributes
+
+    @property
+    def writes_suppressed(self) -> int:
+        """Scritture evitate perché identiche alla precedente."""
+        return 0 if self._slot is None else self._runtime.state_store.writes_suppressed[self._slot]
 
-    def _schedule_exit(self):
-        """Programma il cambio di stato dopo il tempo consider_home."""
+    @property
+    def transitions_absorbed(self) -> int:
+        """Disconnessioni e cambi di zona assorbiti prima di essere applicati."""
+        return 0 if self._slot is None else self._runtime.state_store.transitions_absorbed[self._slot]
 
-        # Se c’è già un timer attivo, non crearne un altro
-        if self._exit_timer:
+    def _snapshot(self):
+        """Stato e attributi esposti in forma compatta, confrontabile con l'ultima scrittura nello store."""
+        store, slot = self._runtime.state_store, self._slot
+        # Le zone sono internate per valore: lo stesso indice implica stesso stato, entity_id e coordinate
+        written = (store.zone[slot] * 2 + store.connected[slot]) * 2 + bool(patch_person.WORKAROUND_HIDE_GPS_ACCURACY)
+        if self._adaptive:
+            return written, self._exit_delay(), self._runtime.adaptive.gaps(self._attr_unique_id)
+        return written, -1.0, -1
+
+    def _async_write_if_changed(self):
+        """Scrive lo stato solo se zona, connessione o uno degli attributi esposti sono cambiati rispetto all'ultima scrittura."""
+        store, slot = self._runtime.state_store, self._slot
+        snapshot = self._snapshot()
+        if snapshot == store.written_snapshot(slot):
+            if self._reconfiguring:
+                return
+            store.writes_suppressed[slot] += 1
+            self._runtime.metrics.writes_suppressed += 1
             return
+        store.set_written(slot, snapshot)
+        store.last_change[slot] = time.time()
+        self._runtime.metrics.state_writes += 1
+        self.async_write_ha_state()
 
-        async def _set_not_home(_now):
-            self._current_zone = STATE_NOT_HOME
-            self._attr_is_connected = False
-            self._attr_zone_entity_id = None
-            self._attr_latitude = None
-            self._attr_longitude = None
-            self._exit_timer = None
-            self.async_write_ha_state()
-            _LOGGER.debug("%s marked as not_home after consider_home timeout.", self._attr_name)
-
-        # Programma il callback
-        self._exit_timer = async_call_later(
-            self.hass, self._consider_home, _set_not_home
-        )
+    def _schedule_exit(self, delay=None):
+        """Programma il cambio di stato dopo il tempo consider_home (o delay) nello scheduler condiviso."""
+
+        # Se c’è già una scadenza attiva, non crearne un'altra
+        if self._runtime.exit_scheduler.is_scheduled(self._slot):
+            return
+
+        if delay is None:
+            delay = self._exit_delay()
+        self._runtime.exit_scheduler.async_schedule(self._slot, delay, self._set_not_home)
+        self._runtime.state_store.exit_deadline[self._slot] = time.time() + delay
+        self._runtime.metrics.exit_timers_armed += 1
+
+    def _exit_delay(self):
+        """consider_home del tracker: quello appreso se attivo e con abbastanza pause osservate, altrimenti quello dell'entry."""
+        if self._adaptive:
+            return self._runtime.adaptive.delay(self._attr_unique_id, self._consider_home)
+        return self._consider_home
+
+    def _cancel_exit(self) -> bool:
+        """Annulla la scadenza consider_home; restituisce True se era programmata."""
+        self._runtime.state_store.exit_deadline[self._slot] = NO_DEADLINE
+        return self._runtime.exit_scheduler.async_cancel(self._slot)
+
+    @callback
+    def _set_not_home(self):
+        """Scadenza consider_home raggiunta: il tracker passa a not_home."""
+        store, slot = self._runtime.state_store, self._slot
+        store.set_zone(slot, 0)
+        store.connected[slot] = 0
+        store.exit_deadline[slot] = NO_DEADLINE
+        self._runtime.metrics.exit_timers_fired += 1
+        self._async_write_if_changed()
+        _LOGGER.debug("%s marked as not_home after consider_home timeout.", self._attr_name)
+
+    @property
+    def extra_restore_state_data(self) -> ExtraStoredData | None:
+        """Zona, connessione e scadenza consider_home da ripristinare al prossimo avvio."""
+        store, slot = self._runtime.state_store, self._slot
+        if slot is None:
+            return None
+        zone = store.zone_of(slot)
+        return RestoredExtraData({
+            "zone": zone.state,
+            # La zona configurata, anche se nel frattempo è stata eliminata
+            "zone_entity_id": zone.source or zone.zone_entity_id,
+            "connected": bool(store.connected[slot]),
+            "exit_deadline": store.deadline_of(slot),
+            "last_change": store.last_change[slot],
+        })
+
+    async def _async_restore_state(self) -> bool:
+        """Ripristina lo stato salvato e riarma la scadenza consider_home con il tempo rimanente; False se non c'è nulla."""
+        last_data = await self.async_get_last_extra_data()
+        if last_data is None:
+            return False
+        data = last_data.as_dict()
+        store, slot = self._runtime.state_store, self._slot
+        zone_entity_id = data.get("zone_entity_id")
+        # Coordinate e nome della zona sono presi dallo stato attuale, non da quello salvato
+        resolved = self._runtime.zone_cache.get(zone_entity_id) if zone_entity_id else zone_from_state(data.get("zone") or STATE_NOT_HOME)
+        store.set_zone(slot, store.intern(resolved))
+        store.connected[slot] = 1 if data.get("connected") else 0
+        store.last_change[slot] = data.get("last_change") or 0.0
+        if zone_entity_id is not None:
+            self._scanner_option_associated_zone = zone_entity_id
+        # Lo stato ripristinato è quello che la piattaforma scriverà dopo l'aggiunta: nessuna scrittura intermedia
+        store.set_written(slot, self._snapshot())
+        deadline = data.get("exit_deadline")
+        if deadline is not None and store.connected[slot]:
+            # Se la scadenza è passata mentre Home Assistant era spento scatta al primo giro del loop
+            self._schedule_exit(max(deadline - time.time(), 0))
+        return True
 
     async def async_added_to_hass(self):
-        """Registra listener e aggiorna immediatamente lo stato iniziale."""
+        """Riserva lo slot, ripristina lo stato salvato, registra il tracker nel dispatcher e lo riconcilia con il sensore."""
 
-        @callback
-        def _sensor_state_listener(event):
-            """Aggiorna lo stato dell'entità basandosi sul sensore target."""
-            new_state = event.data.get("new_state") if event else None
-            self._update_from_sensor(new_state)
+        # Slot assegnato solo alle entità aggiunte davvero: quelle disabilitate nel registry non ne occupano uno
+        self._slot = self._runtime.state_store.allocate()
+        self._zone_table.async_attach()
+        if self._adaptive:
+            await self._runtime.adaptive.async_load()
+        restored = await self._async_restore_state()
 
-        # Listener per il sensore target
-        self._remove_listener = async_track_state_change_event(
-            self.hass, [self._sensor], _sensor_state_listener
-        )
+        # Iscrizione solo dopo gli await: un evento del sensore arrivato nel frattempo verrebbe sovrascritto
+        # dallo stato ripristinato. Da qui alla riconciliazione non ci sono sospensioni
+        self._runtime.async_register_tracker(self._slot, self)
+        self._async_listen_sensor()
 
-        # Aggiornamento iniziale
+        # Aggiornamento iniziale; dopo un ripristino il sensore viene riconciliato solo quando è disponibile
         sensor_state = self.hass.states.get(self._sensor)
+        if restored and (sensor_state is None or sensor_state.state in (STATE_UNAVAILABLE, None)):
+            self._awaiting_sensor = True
+            _LOGGER.debug("%s restored, waiting for sensor %s to become available.", self._attr_name, self._sensor)
+            return
         self._update_from_sensor(sensor_state)
 
+    @callback
+    def async_refresh_zone(self, resolved):
+        """La zona attuale è stata rinominata, spostata o eliminata: aggiorna il tracker senza attendere il sensore."""
+        store, slot = self._runtime.state_store, self._slot
+        store.set_zone(slot, store.intern(resolved))
+        if resolved.zone_entity_id is not None:
+            self._scanner_option_associated_zone = resolved.zone_entity_id
+        self._async_write_if_changed()
+
+    @callback
+    def _async_listen_sensor(self):
+        """Registra il sensore nel dispatcher condiviso, che inoltra a _update_from_sensor solo i cambi di SSID."""
+        # Il BSSID viene seguito solo se l'entry ha voci BSSID; velocità, frequenza e segnale vengono scartati nel filtro
+        # La registrazione sostituisce la precedente; alla rimozione basta sensore e azione, nessuna closure da conservare
+        self._runtime.dispatcher.async_add(self._sensor, self._update_from_sensor, self._zone_table.watched_attributes)
+
+    @callback
+    def async_reconfigure(self, consider_home, flap_damping, adaptive=False):
+        """Applica i nuovi parametri dell'entry e rivaluta il sensore senza ricreare l'entità."""
+        self._consider_home = consider_home
+        self._flap_damping = flap_damping
+        self._adaptive = adaptive
+        if not self._runtime.is_registered(self._slot, self):
+            # Entità non ancora aggiunta, disabilitata o in fase di ripristino: i nuovi parametri valgono dal suo avvio
+            return
+        if adaptive and not self._runtime.adaptive.loaded:
+            # Finché i dati salvati non sono caricati vale il consider_home dell'entry
+            self.hass.async_create_task(self._runtime.adaptive.async_load())
+        # Le voci BSSID possono essere state aggiunte o rimosse: aggiorna gli attributi seguiti dal filtro
+        self._async_listen_sensor()
+        # Un cambio di zona in attesa va rivalutato con la nuova tabella e il nuovo smorzamento
+        self._cancel_pending_zone()
+        self._reconfiguring = True
+        try:
+            self._apply_sensor_state(self.hass.states.get(self._sensor))
+        finally:
+            self._reconfiguring = False
+
     def _update_from_sensor(self, state):
+        """Applica la logica di aggiornamento misurandone il tempo per le metriche."""
+        metrics = self._runtime.metrics
+        metrics.sensor_events[self._sensor] = metrics.sensor_events.get(self._sensor, 0) + 1
+        start = time.perf_counter()
+        self._apply_sensor_state(state)
+        metrics.update_duration.observe(time.perf_counter() - start)
+
+    def _apply_sensor_state(self, state):
         """Applica la logica di aggiornamento."""
+        store, slot = self._runtime.state_store, self._slot
         if state is None or state.state in (STATE_UNAVAILABLE, None):
+            if self._awaiting_sensor:
+                # Sensore non ancora pronto dopo il riavvio: resta valido lo stato ripristinato
+                return
             _LOGGER.debug("Sensor %s not available.", self._sensor)
-            self._attr_is_connected = False
-            self.async_write_ha_state()
+            self._cancel_pending_zone()
+            store.connected[slot] = 0
+            # Sensore non disponibile: non è una pausa del Wi-Fi da cui apprendere
+            store.disconnected_at[slot] = NO_DEADLINE
+            self._async_write_if_changed()
             return
 
-        if state.state == self._ssid_home or state.state in self._ssid_zone_map:
-            self._attr_is_connected = True
-            if state.state == self._ssid_home:
-                self._current_zone = STATE_HOME
-                self._attr_zone_entity_id = ENTITY_ID_HOME
-                self._scanner_option_associated_zone = ENTITY_ID_HOME
-                # Azzeriamo latitude e longitude quando siamo "home", il core li prenderà automaticamente dalla zona
-                self._attr_latitude = None
-                self._attr_longitude = None
-            else:
-                zone_entity_id = self._ssid_zone_map[state.state]
-                # se la zona extra è "zone.home", trattala come home
-                if zone_entity_id == ENTITY_ID_HOME:
-                    self._current_zone = STATE_HOME
-                    self._attr_zone_entity_id = ENTITY_ID_HOME
-                    self._scanner_option_associated_zone = ENTITY_ID_HOME
-                    # Azzeriamo latitude e longitude quando siamo "home", il core li prenderà automaticamente dalla zona
-                    self._attr_latitude = None
-                    self._attr_longitude = None
-                else:
-                    zone_state = self.hass.states.get(zone_entity_id)
-                    if zone_state:
-                        # friendly name (es. "Lavoro", "Scuola", ecc.)
-                        self._current_zone = zone_state.attributes.get(
-                            ATTR_FRIENDLY_NAME,
-                            zone_entity_id.partition("zone.")[2] # fallback --> se la zona non avesse un friendly name lo creiamo
-                        )
-                        self._attr_zone_entity_id = zone_entity_id
-                        self._scanner_option_associated_zone = zone_entity_id
-                        # Aggiorniamo latitude e longitude se la zona è trovata
-                        self._attr_latitude = zone_state.attributes.get("latitude")
-                        self._attr_longitude = zone_state.attributes.get("longitude")
-                    else:
-                        # fallback: zona non esistente (esempio: zona cancellata ma rimasta nelle opzioni dell'integrazione) togli "zone." e crea un friendly name
-                        self._current_zone = zone_entity_id.partition("zone.")[2].capitalize() or zone_entity_id
-                        _LOGGER.debug("Zone %s not found in HA, using fallback '%s'", zone_entity_id, self._current_zone)
-                        self._attr_zone_entity_id = None
-                        # La zona non esiste, azzeriamo latitude e longitude
-                        self._attr_latitude = None
-                        self._attr_longitude = None
-
-            self.async_write_ha_state()
-
-            # se c’era un timer di uscita → annullalo
-            if self._exit_timer:
-                self._exit_timer()
-                self._exit_timer = None
+        self._awaiting_sensor = False
+
+        # Una sola lookup nella tabella precalcolata SSID → zona condivisa da tutti i tracker
+        resolved = self._zone_table.get(state.state, state.attributes.get(ATTR_BSSID))
+        if resolved is not None:
+            if resolved.zone_entity_id is None:
+                self._runtime.metrics.zone_fallbacks += 1
+            zone_index = store.intern(resolved)
+
+            # Fine della pausa di connessione in corso, se c'era: ogni pausa entro ADAPTIVE_MAX_DELAY alimenta il ritardo appreso,
+            # anche se più lunga del ritardo attuale e conclusa dopo l'uscita, altrimenti il ritardo non potrebbe mai crescere
+            disconnected_at = store.disconnected_at[slot]
+            store.disconnected_at[slot] = NO_DEADLINE
+            if self._adaptive and not math.isnan(disconnected_at):
+                self._runtime.adaptive.observe(self._attr_unique_id, self._runtime.exit_scheduler.now() - disconnected_at)
+
+            # se c’era una scadenza di uscita → annullala, la disconnessione è stata assorbita da consider_home
+            if self._cancel_exit():
+                self._runtime.metrics.exit_timers_cancelled += 1
+                self._count_absorbed()
+
+            # Cambio di zona mentre siamo connessi: con lo smorzamento attivo va confermato dopo flap_damping secondi
+            if self._flap_damping and store.connected[slot] and zone_index != store.zone[slot]:
+                if zone_index != store.pending_zone[slot]:
+                    store.set_pending_zone(slot, zone_index)
+                    self._runtime.exit_scheduler.async_schedule(~self._slot, self._flap_damping, self._commit_pending_zone)
+                return
+
+            # Il sensore è tornato sulla zona attuale prima della conferma: il cambio è stato assorbito
+            if self._cancel_pending_zone():
+                self._count_absorbed()
+
+            self._commit_zone(zone_index)
 
         # Se invece non risultiamo in nessuna zona esistente
         else:
+            self._cancel_pending_zone()
+            if store.connected[slot] and math.isnan(store.disconnected_at[slot]):
+                store.disconnected_at[slot] = self._runtime.exit_scheduler.now()
             self._schedule_exit()
 
+    def _commit_zone(self, zone_index):
+        """Applica la zona al tracker e scrive lo stato se è cambiato."""
+        store, slot = self._runtime.state_store, self._slot
+        store.set_zone(slot, zone_index)
+        store.connected[slot] = 1
+        zone_entity_id = store.zone_of(slot).zone_entity_id
+        if zone_entity_id is not None:
+            self._scanner_option_associated_zone = zone_entity_id
+        self._async_write_if_changed()
+
+    @callback
+    def _commit_pending_zone(self):
+        """Il cambio di zona è rimasto stabile per tutta la finestra di smorzamento: lo confermiamo."""
+        store, slot = self._runtime.state_store, self._slot
+        zone_index = store.pending_zone[slot]
+        if zone_index != NO_ZONE:
+            # La zona in attesa può essere stata modificata durante la finestra: uso la versione attuale
+            source = store.zone_at(zone_index).source
+            store.set_pending_zone(slot, NO_ZONE)
+            if source is not None:
+                zone_index = store.intern(self._runtime.zone_cache.get(source))
+            self._commit_zone(zone_index)
+
+    def _cancel_pending_zone(self) -> bool:
+        """Annulla un cambio di zona in attesa di conferma; restituisce True se c'era."""
+        store, slot = self._runtime.state_store, self._slot
+        if store.pending_zone[slot] == NO_ZONE:
+            return False
+        store.set_pending_zone(slot, NO_ZONE)
+        self._runtime.exit_scheduler.async_cancel(~self._slot)
+        return True
+
+    def _count_absorbed(self):
+        self._runtime.state_store.transitions_absorbed[self._slot] += 1
+        self._runtime.metrics.transitions_absorbed += 1
+
     async def async_will_remove_from_hass(self):
-        """Rimuove il listener e annulla il timer."""
-        if self._remove_listener:
-            self._remove_listener()
-            self._remove_listener = None
-        if self._exit_timer:
-            self._exit_timer()
-            self._exit_timer = None
+        """Rimuove il listener, annulla le scadenze e libera lo slot nello store."""
+        slot = self._slot
+        if slot is None:
+            return
+        runtime = self._runtime
+        runtime.dispatcher.async_remove(self._sensor, self._update_from_sensor)
+        runtime.async_unregister_tracker(slot, self)
+        self._zone_table.async_detach()
+        runtime.exit_scheduler.async_cancel(slot)
+        runtime.exit_scheduler.async_cancel(~slot)
+        runtime.state_store.release(slot)
+        self._slot = None
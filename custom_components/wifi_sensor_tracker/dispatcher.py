@@ -0,0 +1,113 @@
+"""Dispatcher unico degli eventi di stato delle entità monitorate dall'integrazione."""
+from __future__ import annotations
+import logging
+from typing import Callable, Dict, Optional, Set, Tuple
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from .metrics import async_get_metrics
+from .profiler import callback_name
+
+_LOGGER = logging.getLogger(__package__)
+
+
+class SensorStateDispatcher:
+    """Sottoscrive una sola volta state_changed e smista gli eventi tramite una mappa entity_id → azione.
+
+    Le azioni registrate sono i tracker (un sensore Wi-Fi ciascuno) e la tabella delle zone (una voce per zona).
+    Per ogni entità si possono indicare gli attributi rilevanti: gli eventi che cambiano solo altri attributi
+    vengono scartati nel filtro, prima di creare il job del listener.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._actions: Dict[str, Callable[[Optional[State]], None]] = {}
+        # Attributi rilevanti per entità; None = ogni modifica viene inoltrata
+        self._watched: Dict[str, Optional[Tuple[str, ...]]] = {}
+        # Entità per cui conta solo il cambio degli attributi seguiti, non dello stato (es. il numero di persone di una zona)
+        self._ignore_state: Set[str] = set()
+        self._metrics = async_get_metrics(hass)
+        self._unsub: Optional[CALLBACK_TYPE] = None
+        # Impostato dal servizio profile solo per la durata della sessione di profilazione
+        self.profiler = None
+
+    @callback
+    def async_add(
+        self,
+        entity_id: str,
+        action: Callable[[Optional[State]], None],
+        attributes: Optional[Tuple[str, ...]] = None,
+        ignore_state: bool = False,
+    ) -> CALLBACK_TYPE:
+        """Registra l'azione da eseguire per l'entità indicata e restituisce la funzione per rimuoverla.
+
+        Con attributes l'azione riceve solo i cambi di stato e di quegli attributi; senza, ogni modifica.
+        Con ignore_state anche i cambi di stato vengono scartati se gli attributi seguiti non cambiano.
+        """
+        self._actions[entity_id] = action
+        self._watched[entity_id] = attributes
+        if ignore_state and attributes is not None:
+            self._ignore_state.add(entity_id)
+        else:
+            self._ignore_state.discard(entity_id)
+        # La sottoscrizione al bus viene creata solo alla prima registrazione, le successive aggiornano soltanto la mappa
+        if self._unsub is None:
+            self._unsub = self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED, self._async_dispatch, event_filter=self._async_filter
+            )
+            _LOGGER.debug("Sensor state dispatcher subscribed to state_changed.")
+
+        @callback
+        def _remove() -> None:
+            self.async_remove(entity_id, action)
+
+        return _remove
+
+    @callback
+    def async_remove(self, entity_id: str, action: Optional[Callable[[Optional[State]], None]] = None) -> None:
+        """Rimuove l'azione associata all'entità; all'ultima rimozione annulla la sottoscrizione."""
+        # Evita di rimuovere un'azione registrata nel frattempo sulla stessa entità
+        if action is not None and self._actions.get(entity_id) != action:
+            return
+        self._actions.pop(entity_id, None)
+        self._watched.pop(entity_id, None)
+        self._ignore_state.discard(entity_id)
+        if not self._actions and self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+            _LOGGER.debug("Sensor state dispatcher unsubscribed from state_changed.")
+
+    @callback
+    def _async_filter(self, event_data) -> bool:
+        """Scarta prima del dispatch gli eventi di entità non monitorate e quelli che cambiano solo attributi non usati."""
+        entity_id = event_data["entity_id"]
+        if entity_id not in self._actions:
+            return False
+        watched = self._watched[entity_id]
+        if watched is None:
+            return True
+        old_state = event_data.get("old_state")
+        new_state = event_data.get("new_state")
+        if old_state is None or new_state is None:
+            return True
+        if old_state.state != new_state.state and entity_id not in self._ignore_state:
+            return True
+        old_attributes = old_state.attributes
+        new_attributes = new_state.attributes
+        for attribute in watched:
+            if old_attributes.get(attribute) != new_attributes.get(attribute):
+                return True
+        # Solo attributi come BSSID, velocità del link o segnale: nessun lavoro per il tracker
+        dropped = self._metrics.sensor_events_dropped
+        dropped[entity_id] = dropped.get(entity_id, 0) + 1
+        return False
+
+    @callback
+    def _async_dispatch(self, event: Event) -> None:
+        """Inoltra il nuovo stato dell'entità all'azione registrata."""
+        action = self._actions.get(event.data["entity_id"])
+        if action is None:
+            return
+        if self.profiler is None:
+            action(event.data.get("new_state"))
+        else:
+            self.profiler.call(callback_name(action), action, event.data.get("new_state"))
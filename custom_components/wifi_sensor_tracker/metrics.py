@@ -0,0 +1,113 @@
+"""Metriche interne dell'integrazione esposte in formato testo Prometheus."""
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+from aiohttp import web
+from homeassistant.components.http import KEY_HASS, HomeAssistantView
+from homeassistant.core import HomeAssistant
+from . import DOMAIN
+
+METRICS_URL = f"/api/{DOMAIN}/metrics"
+_PREFIX = DOMAIN
+
+# Limiti (in secondi) dei bucket dell'istogramma dei tempi di _update_from_sensor
+UPDATE_DURATION_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01)
+
+
+class Histogram:
+    """Istogramma a bucket fissi: l'osservazione costa una bisect e due somme."""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class IntegrationMetrics:
+    """Contatori dei percorsi caldi; sono semplici interi incrementati sul loop, senza lock."""
+
+    def __init__(self) -> None:
+        self.sensor_events: Dict[str, int] = {}
+        self.sensor_events_dropped: Dict[str, int] = {}
+        self.state_writes = 0
+        self.writes_suppressed = 0
+        self.exit_timers_armed = 0
+        self.exit_timers_cancelled = 0
+        self.exit_timers_fired = 0
+        self.zone_fallbacks = 0
+        self.transitions_absorbed = 0
+        self.location_requests_sent = 0
+        self.location_requests_failed = 0
+        self.update_duration = Histogram(UPDATE_DURATION_BUCKETS)
+
+    def render(self) -> str:
+        """Restituisce tutte le metriche nel formato di esposizione testuale di Prometheus."""
+        lines: List[str] = []
+
+        def _counter(name: str, help_text: str, value: int) -> None:
+            lines.append(f"# HELP {_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {_PREFIX}_{name} counter")
+            lines.append(f"{_PREFIX}_{name} {value}")
+
+        lines.append(f"# HELP {_PREFIX}_sensor_events_total Wi-Fi sensor state events received per tracker.")
+        lines.append(f"# TYPE {_PREFIX}_sensor_events_total counter")
+        for sensor, value in sorted(self.sensor_events.items()):
+            lines.append(f'{_PREFIX}_sensor_events_total{{sensor="{sensor}"}} {value}')
+
+        lines.append(f"# HELP {_PREFIX}_sensor_events_dropped_total Attribute-only Wi-Fi sensor updates dropped before dispatch.")
+        lines.append(f"# TYPE {_PREFIX}_sensor_events_dropped_total counter")
+        for sensor, value in sorted(self.sensor_events_dropped.items()):
+            lines.append(f'{_PREFIX}_sensor_events_dropped_total{{sensor="{sensor}"}} {value}')
+
+        _counter("state_writes_total", "Tracker state writes issued.", self.state_writes)
+        _counter("state_writes_suppressed_total", "Tracker state writes skipped because nothing changed.", self.writes_suppressed)
+        _counter("exit_timers_armed_total", "consider_home exit deadlines scheduled.", self.exit_timers_armed)
+        _counter("exit_timers_cancelled_total", "consider_home exit deadlines cancelled by a reconnect.", self.exit_timers_cancelled)
+        _counter("exit_timers_fired_total", "consider_home exit deadlines that marked a tracker not_home.", self.exit_timers_fired)
+        _counter("zone_fallbacks_total", "Sensor updates resolved to a configured zone that does not exist.", self.zone_fallbacks)
+        _counter("transitions_absorbed_total", "Disconnections and zone switches absorbed before being committed.", self.transitions_absorbed)
+        _counter("location_requests_sent_total", "request_location_update notifications sent.", self.location_requests_sent)
+        _counter("location_requests_failed_total", "request_location_update notifications that failed.", self.location_requests_failed)
+
+        hist = self.update_duration
+        name = f"{_PREFIX}_update_duration_seconds"
+        lines.append(f"# HELP {name} Time spent in _update_from_sensor.")
+        lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(hist.buckets, hist.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{le="+Inf"}} {hist.count}')
+        lines.append(f"{name}_sum {hist.sum}")
+        lines.append(f"{name}_count {hist.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def async_get_metrics(hass: HomeAssistant) -> IntegrationMetrics:
+    """Restituisce l'istanza unica delle metriche, creandola al primo utilizzo."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    metrics = domain_data.get("metrics")
+    if metrics is None:
+        metrics = domain_data["metrics"] = IntegrationMetrics()
+    return metrics
+
+
+class WifiSensorTrackerMetricsView(HomeAssistantView):
+    """Vista HTTP locale che espone le metriche senza passare dal recorder."""
+
+    url = METRICS_URL
+    name = f"api:{DOMAIN}:metrics"
+    requires_auth = True
+
+    async def get(self, request: web.Request) -> web.Response:
+        hass = request.app[KEY_HASS]
+        return web.Response(text=async_get_metrics(hass).render(), content_type="text/plain")
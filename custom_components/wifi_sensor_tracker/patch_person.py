@@ -4,9 +4,18 @@ import inspect
 import hashlib
 import textwrap
 import re
-from homeassistant.core import State, callback
+import base64
+import marshal
+import sys
+import time
+from types import CodeType
+from homeassistant.core import HomeAssistant, State, callback
+from homeassistant.helpers import entity_registry as er
+from homeassistant.helpers.storage import Store
+from homeassistant.loader import async_get_integration
 from typing import Optional
 from homeassistant.const import (
+    EVENT_STATE_CHANGED,
     ATTR_LATITUDE,
     ATTR_LONGITUDE,
     ATTR_GPS_ACCURACY,
@@ -33,6 +42,10 @@ except ImportError:
         SourceType,
     )
     ATTR_IN_ZONES = "in_zones"
+try:
+    from homeassistant.components.person import ATTR_DEVICE_TRACKERS
+except ImportError:
+    ATTR_DEVICE_TRACKERS = "device_trackers"
 from homeassistant.components.zone import ENTITY_ID_HOME
 
 # Costante da impostare a True nel caso in cui venisse accettata la PR al core di Home Assistant ed uscisse quindi una nuova versione che non necessita le patch
@@ -63,6 +76,9 @@ REFERENCE_HASHES = {
 }
 
 
+# Versione del formato della cache persistente delle patch compilate
+PATCH_CACHE_VERSION = 1
+
 _LOGGER = logging.getLogger(__package__)
 
 
@@ -177,76 +193,196 @@ def _modify_parse_source_state(func_code: str) -> str:
     return "\n".join(patched_lines)
 
 
-def _patch_update_state():
-    original_code = inspect.getsource(Person._update_state)
-    # rimuove l'indentazione eccessiva in comune a tutte le righe perchè importata da dentro una classe
-    original_code = textwrap.dedent(original_code)
-    patched_code = _modify_update_state(original_code)
+# Funzioni di riscrittura del sorgente per ciascuna funzione monitorata
+PATCHERS = {
+    "_update_state": _modify_update_state,
+    "_parse_source_state": _modify_parse_source_state,
+}
 
-    if patched_code != original_code:
-        # Compila la stringa patchata in un oggetto funzione eseguibile
-        local_vars = {}
-        exec(patched_code, globals(), local_vars)
 
-        # Recupera l'oggetto funzione dal contesto locale
-        patched_func = local_vars.get("_update_state")
-        if not patched_func:
-            _LOGGER.debug("Person patch: exec succeeded, but _update_state not found.")
-            return
-        # Sostituisci la funzione originale con quella patchata
-        Person._update_state = patched_func
+def _code_fingerprint(func) -> str:
+    # Impronta del bytecode della funzione: non richiede la lettura del sorgente da disco
+    code = func.__code__
+    return hashlib.sha1(marshal.dumps(code) + code.co_qualname.encode("utf-8")).hexdigest()
 
 
-def _patch_parse_source_state():
-    original_code = inspect.getsource(Person._parse_source_state)
+def _compile_patch(func_name: str, func) -> Optional[CodeType]:
+    # Recupera il sorgente, applica la modifica e compila il risultato; None se la patch è già presente
+    original_code = inspect.getsource(func)
     # rimuove l'indentazione eccessiva in comune a tutte le righe perchè importata da dentro una classe
     original_code = textwrap.dedent(original_code)
-    patched_code = _modify_parse_source_state(original_code)
-
-    if patched_code != original_code:
-        # Compila la stringa patchata in un oggetto funzione eseguibile
-        local_vars = {}
-        exec(patched_code, globals(), local_vars)
-
-        # Recupera l'oggetto funzione dal contesto locale
-        patched_func = local_vars.get("_parse_source_state")
-        if not patched_func:
-            _LOGGER.debug("Person patch: exec succeeded, but _parse_source_state not found.")
-            return
-        # Sostituisci la funzione originale con quella patchata
-        Person._parse_source_state = patched_func
+    patched_code = PATCHERS[func_name](original_code)
+    if patched_code == original_code:
+        return None
+    # Compila la stringa patchata in un oggetto codice eseguibile
+    return compile(patched_code, f"<person_patch {func_name}>", "exec")
+
+
+def _install_patch(func_name: str, code: Optional[CodeType]) -> bool:
+    if code is None:
+        return False
+    local_vars = {}
+    exec(code, globals(), local_vars)
+
+    # Recupera l'oggetto funzione dal contesto locale
+    patched_func = local_vars.get(func_name)
+    if not patched_func:
+        _LOGGER.debug("Person patch: exec succeeded, but %s not found.", func_name)
+        return False
+    # Sostituisci la funzione originale con quella patchata
+    setattr(Person, func_name, patched_func)
+    return True
+
+
+def _prepare_patch(func_name: str, func, cache: dict, cache_key: str) -> tuple:
+    # Restituisce (compatibile, codice patchato, cache aggiornata) usando la cache persistente quando la chiave coincide
+    cached = cache.get(func_name)
+    if cached and cached.get("key") == cache_key:
+        code = cached.get("code")
+        return cached["compatible"], marshal.loads(base64.b64decode(code)) if code else None, False
+
+    compatible = _get_function_hash(func) in REFERENCE_HASHES[func_name].values()
+    code = _compile_patch(func_name, func) if compatible else None
+    cache[func_name] = {
+        "key": cache_key,
+        "compatible": compatible,
+        "code": base64.b64encode(marshal.dumps(code)).decode("ascii") if code else None,
+    }
+    return compatible, code, True
 
 
-def apply_person_patch():
-    # Applica la patch solo se le funzioni Person._update_state e _parse_source_state sono compatibili e necessarie.
+def _prepare_person_patch(cache: dict, integration_version: str) -> tuple:
+    # Eseguita in un executor: impronte, lettura del sorgente, riscrittura e compilazione non bloccano il loop.
+    # Restituisce (compatibilità per funzione, codici patchati, cache aggiornata).
     monitored_functions = {
         "_update_state": Person._update_state,
         "_parse_source_state": Person._parse_source_state,
     }
 
     compatible = {}
+    patches = {}
+    cache_changed = False
     for func_name, func_ref in monitored_functions.items():
-        current_hash = _get_function_hash(func_ref)
-        if current_hash in REFERENCE_HASHES[func_name].values():
-            compatible[func_name] = True
-        else:
-            compatible[func_name] = False
+        # La chiave include l'impronta della funzione originale, la versione di Python e quella dell'integrazione
+        cache_key = f"{_code_fingerprint(func_ref)}|{sys.version}|{integration_version}"
+        compatible[func_name], patches[func_name], changed = _prepare_patch(func_name, func_ref, cache, cache_key)
+        cache_changed = cache_changed or changed
+    return compatible, patches, cache_changed
 
+
+def _install_person_patch(compatible: dict, patches: dict) -> bool:
+    # Applica la patch solo se le funzioni Person._update_state e _parse_source_state sono compatibili e necessarie.
+    # Restituisce True se almeno una funzione di Person è stata sostituita.
     # Tutte compatibili → applica patch completa
     if all(compatible.values()):
-        _patch_update_state()
-        _patch_parse_source_state()
+        installed = _install_patch("_update_state", patches["_update_state"])
+        installed = _install_patch("_parse_source_state", patches["_parse_source_state"]) or installed
         _LOGGER.debug("Person patch applied successfully.")
+        return installed
 
     # Nessuna compatibile → blocca patching, avvisa solo se il core non è già stato aggiornato con le modifiche necessarie
     elif not any(compatible.values()):
         if not CORE_ALREADY_UPDATED:
             _LOGGER.warning("Core Person component version is not compatible; patch NOT applied. Wait for integration update.")
+        return False
 
     # Caso misto → applicazione parziale
-    else:
-        if compatible["_update_state"]:
-            _patch_update_state()
-            global WORKAROUND_HIDE_GPS_ACCURACY
-            WORKAROUND_HIDE_GPS_ACCURACY = True
-            _LOGGER.debug("Person patch partially applied. GPS precision attribute will be hidden by setting the field to None.")
+    if compatible["_update_state"]:
+        installed = _install_patch("_update_state", patches["_update_state"])
+        global WORKAROUND_HIDE_GPS_ACCURACY
+        WORKAROUND_HIDE_GPS_ACCURACY = True
+        _LOGGER.debug("Person patch partially applied. GPS precision attribute will be hidden by setting the field to None.")
+        return installed
+    return False
+
+
+@callback
+def _async_refresh_persons(hass: HomeAssistant) -> int:
+    # Le Person già aggiunte hanno calcolato lo stato con le funzioni originali e lo ricalcolerebbero solo al prossimo
+    # cambio di un loro tracker: forza subito il ricalcolo di quelle che usano i nostri tracker
+    data = hass.data.get("person")
+    if not isinstance(data, tuple) or len(data) < 3 or not hasattr(data[2], "entities"):
+        _LOGGER.debug("Person patch: person entities not found, states will refresh on the next tracker update.")
+        return 0
+    refreshed = 0
+    for person in list(data[2].entities):
+        if person.hass is None or person.entity_id is None or not _uses_our_trackers(hass, person.device_trackers):
+            continue
+        person._update_state()
+        refreshed += 1
+    return refreshed
+
+
+async def async_apply_person_patch(hass: HomeAssistant) -> None:
+    # Applica la patch usando la cache persistente in .storage dei codici già compilati
+    from . import DOMAIN
+    store = Store(hass, PATCH_CACHE_VERSION, f"{DOMAIN}.person_patch")
+    cache = await store.async_load() or {}
+    integration = await async_get_integration(hass, DOMAIN)
+
+    # Il lavoro sul sorgente avviene nell'executor, sul loop resta solo l'installazione delle funzioni compilate
+    started = time.perf_counter()
+    compatible, patches, cache_changed = await hass.async_add_executor_job(
+        _prepare_person_patch, cache, str(integration.version)
+    )
+    prepared = time.perf_counter()
+    refreshed = _async_refresh_persons(hass) if _install_person_patch(compatible, patches) else 0
+    installed = time.perf_counter()
+    _LOGGER.debug(
+        "Person patch: prepared in executor in %.2f ms (%s start), event loop blocked for %.2f ms, %d persons refreshed.",
+        (prepared - started) * 1000, "cold" if cache_changed else "warm", (installed - prepared) * 1000, refreshed,
+    )
+
+    if cache_changed:
+        await store.async_save(cache)
+
+
+def _uses_our_trackers(hass: HomeAssistant, tracker_ids) -> bool:
+    # Indica se tra i device_tracker indicati c'è almeno un'entità creata da questa integrazione
+    from . import DOMAIN
+    entity_reg = er.async_get(hass)
+    for tracker_id in tracker_ids:
+        entry = entity_reg.async_get(tracker_id)
+        if entry is not None and entry.platform == DOMAIN:
+            return True
+    return False
+
+
+def _person_uses_our_trackers(hass: HomeAssistant, person_state: Optional[State]) -> bool:
+    # Indica se la Person ha tra i suoi device_tracker almeno un'entità creata da questa integrazione
+    if person_state is None:
+        return False
+    return _uses_our_trackers(hass, person_state.attributes.get(ATTR_DEVICE_TRACKERS, []))
+
+
+@callback
+def async_setup_person_patch(hass: HomeAssistant) -> None:
+    # Applica la patch solo quando esiste una Person che usa uno dei nostri tracker, subito o appena viene creata/modificata
+    if any(_person_uses_our_trackers(hass, state) for state in hass.states.async_all("person")):
+        hass.async_create_task(_async_apply_person_patch_safe(hass))
+        return
+
+    unsub = None
+
+    @callback
+    def _person_filter(event_data) -> bool:
+        return event_data["entity_id"].startswith("person.") and _person_uses_our_trackers(hass, event_data.get("new_state"))
+
+    @callback
+    def _on_person_changed(event):
+        nonlocal unsub
+        if unsub is None:
+            return
+        unsub()
+        unsub = None
+        hass.async_create_task(_async_apply_person_patch_safe(hass))
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, _on_person_changed, event_filter=_person_filter)
+    _LOGGER.debug("Person patch deferred until a Person uses a Wi-Fi Sensor Tracker entity.")
+
+
+async def _async_apply_person_patch_safe(hass: HomeAssistant) -> None:
+    try:
+        await async_apply_person_patch(hass)
+    except Exception as e:
+        _LOGGER.warning("Patch Person: errore nell'importazione o applicazione: %s", e)
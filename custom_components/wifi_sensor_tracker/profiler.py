@@ -0,0 +1,154 @@
+"""Servizio di profilazione su richiesta dei callback dell'integrazione."""
+from __future__ import annotations
+import asyncio
+import cProfile
+import logging
+import time
+from typing import Any, Callable, Dict, List
+import voluptuous as vol
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+from . import DOMAIN
+
+_LOGGER = logging.getLogger(__package__)
+
+SERVICE_PROFILE = "profile"
+ATTR_DURATION = "duration"
+ATTR_BUDGET_MS = "budget_ms"
+
+# Callback lenti conservati nel risultato; oltre questo numero vengono solo contati
+MAX_SLOW_CALLBACKS = 100
+
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=60): vol.All(vol.Coerce(float), vol.Range(min=1, max=3600)),
+        vol.Optional(ATTR_BUDGET_MS, default=5): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }
+)
+
+
+def callback_name(func: Callable[..., Any]) -> str:
+    """Nome del callback nei risultati; le partial (es. il listener delle zone) non hanno __qualname__."""
+    target = getattr(func, "func", func)
+    return getattr(target, "__qualname__", repr(func))
+
+
+class CallbackProfiler:
+    """Profilazione deterministica attiva solo durante i callback dell'integrazione, non sull'intero loop.
+
+    Misura anche la durata di ogni chiamata e registra quelle che superano il budget.
+    """
+
+    def __init__(self, budget: float) -> None:
+        self.budget = budget
+        self.profile = cProfile.Profile()
+        self.calls: Dict[str, int] = {}
+        self.slow: List[Dict[str, Any]] = []
+        self.slow_count = 0
+        # I callback possono annidarsi (dispatch → scrittura di stato → Person): si profila solo il livello esterno
+        self._depth = 0
+
+    def call(self, name: str, func: Callable[..., Any], *args: Any) -> Any:
+        """Esegue func profilandola e misurandone la durata."""
+        self.calls[name] = self.calls.get(name, 0) + 1
+        outer = self._depth == 0
+        self._depth += 1
+        start = time.perf_counter()
+        if outer:
+            self.profile.enable()
+        try:
+            return func(*args)
+        finally:
+            if outer:
+                self.profile.disable()
+            self._depth -= 1
+            elapsed = time.perf_counter() - start
+            if elapsed > self.budget:
+                self.slow_count += 1
+                if len(self.slow) < MAX_SLOW_CALLBACKS:
+                    self.slow.append({
+                        "callback": name,
+                        "duration_ms": round(elapsed * 1000, 3),
+                        "time": dt_util.utcnow().isoformat(),
+                    })
+
+
+@callback
+def _async_wrap_person(profiler: CallbackProfiler) -> Callable[[], None]:
+    """Sostituisce Person._update_state (patchata o no) con una versione profilata; restituisce il ripristino."""
+    try:
+        from homeassistant.components.person import Person
+    except ImportError:
+        return lambda: None
+    original = Person._update_state
+
+    def _update_state(self):
+        return profiler.call("Person._update_state", original, self)
+
+    Person._update_state = _update_state
+
+    def _restore() -> None:
+        # Se nel frattempo è stata applicata la patch di Person, non va sovrascritta
+        if Person._update_state is _update_state:
+            Person._update_state = original
+
+    return _restore
+
+
+@callback
+def async_setup_profile_service(hass: HomeAssistant) -> None:
+    """Registra il servizio wifi_sensor_tracker.profile."""
+
+    async def _async_profile(call: ServiceCall) -> ServiceResponse:
+        from .runtime import async_get_runtime
+        runtime = async_get_runtime(hass)
+        if runtime.dispatcher.profiler is not None:
+            raise HomeAssistantError("A profiling session is already running")
+
+        duration = call.data[ATTR_DURATION]
+        profiler = CallbackProfiler(call.data[ATTR_BUDGET_MS] / 1000)
+        # cProfile non può convivere con un altro profiler attivo (es. l'integrazione Profiler del core)
+        try:
+            profiler.profile.enable()
+            profiler.profile.disable()
+        except ValueError as err:
+            raise HomeAssistantError(f"Cannot start profiling: {err}") from err
+
+        runtime.dispatcher.profiler = profiler
+        runtime.exit_scheduler.profiler = profiler
+        restore_person = _async_wrap_person(profiler)
+        _LOGGER.info("Profiling Wi-Fi Sensor Tracker callbacks for %.0f seconds.", duration)
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            runtime.dispatcher.profiler = None
+            runtime.exit_scheduler.profiler = None
+            restore_person()
+
+        path = hass.config.path(f"{DOMAIN}_profile_{dt_util.utcnow().strftime('%Y%m%d_%H%M%S')}.prof")
+        await hass.async_add_executor_job(profiler.profile.dump_stats, path)
+
+        _LOGGER.info(
+            "Profiling finished: %d callbacks, %d over the %.1f ms budget. Stats written to %s",
+            sum(profiler.calls.values()), profiler.slow_count, call.data[ATTR_BUDGET_MS], path,
+        )
+        for slow in profiler.slow[:10]:
+            _LOGGER.warning("Slow callback %s took %.3f ms at %s", slow["callback"], slow["duration_ms"], slow["time"])
+
+        if not call.return_response:
+            return None
+        return {
+            "file": path,
+            "calls": dict(profiler.calls),
+            "slow_count": profiler.slow_count,
+            "slow": profiler.slow,
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PROFILE,
+        _async_profile,
+        schema=PROFILE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
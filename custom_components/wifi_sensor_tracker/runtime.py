@@ -0,0 +1,83 @@
+"""Motore runtime condiviso da tutti i config entry dell'integrazione."""
+from __future__ import annotations
+import logging
+from typing import Any, Dict, Optional
+from homeassistant.core import HomeAssistant, callback
+from . import DOMAIN
+from .adaptive import AdaptiveConsiderHome
+from .dispatcher import SensorStateDispatcher
+from .metrics import async_get_metrics
+from .scheduler import ExitScheduler
+from .state_store import TrackerStateStore
+from .zones import ResolvedZone, ZoneCache
+
+_LOGGER = logging.getLogger(__package__)
+
+
+class WifiSensorTrackerRuntime:
+    """Listener, cache delle zone, scheduler delle uscite e stato dei tracker, unici per tutta l'integrazione.
+
+    Ogni config entry aggiunge solo la propria tabella SSID → zona e i propri tracker:
+    aggiungere una sede non duplica sottoscrizioni al bus né timer del loop.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        # Un solo dispatcher smista gli eventi di tutti i sensori e di tutte le zone configurate
+        self.dispatcher = SensorStateDispatcher(hass)
+        # Zone risolte condivise, aggiornate solo quando cambia una zona usata da almeno un entry
+        self.zone_cache = ZoneCache(hass, self.dispatcher)
+        # Un solo timer del loop per tutte le scadenze consider_home e di smorzamento
+        self.exit_scheduler = ExitScheduler(hass)
+        # Stato runtime di tutti i tracker in colonne compatte
+        self.state_store = TrackerStateStore()
+        self.metrics = async_get_metrics(hass)
+        # Ritardi consider_home appresi per tracker, caricati dallo storage solo se un entry li usa
+        self.adaptive = AdaptiveConsiderHome(hass)
+        # Tracker di ogni config entry con piattaforma attiva, per le riconfigurazioni al volo
+        self.entries: Dict[str, Any] = {}
+        # Tracker attivi per slot: con l'indice inverso dello store trova quelli da aggiornare quando cambia una zona
+        self._trackers: Dict[int, Any] = {}
+        self.zone_cache.async_listen_changes(self._async_zone_changed)
+
+    @callback
+    def async_register_tracker(self, slot: int, tracker: Any) -> None:
+        """Registra il tracker attivo nello slot."""
+        self._trackers[slot] = tracker
+
+    @callback
+    def async_unregister_tracker(self, slot: int, tracker: Any) -> None:
+        """Rimuove il tracker dallo slot, se è ancora quello registrato."""
+        if self._trackers.get(slot) is tracker:
+            del self._trackers[slot]
+
+    def is_registered(self, slot: Optional[int], tracker: Any) -> bool:
+        """Indica se il tracker è attivo nello slot, cioè aggiunto e con lo stato già ripristinato."""
+        return slot is not None and self._trackers.get(slot) is tracker
+
+    @callback
+    def _async_zone_changed(self, zone_entity_id: str, resolved: ResolvedZone) -> None:
+        """Propaga rinomina, spostamento o eliminazione di una zona ai soli tracker che vi si trovano."""
+        store = self.state_store
+        key = resolved[:5]
+        refreshed = 0
+        for slot in list(store.slots_in_zone(zone_entity_id)):
+            # Tracker già sulla stessa zona risolta: nessun aggiornamento né scrittura evitata da contare
+            if store.zone_of(slot)[:5] == key:
+                continue
+            tracker = self._trackers.get(slot)
+            if tracker is not None:
+                tracker.async_refresh_zone(resolved)
+                refreshed += 1
+        if refreshed:
+            _LOGGER.debug("Zone %s changed, %d trackers refreshed.", zone_entity_id, refreshed)
+
+
+@callback
+def async_get_runtime(hass: HomeAssistant) -> WifiSensorTrackerRuntime:
+    """Restituisce il motore condiviso, creandolo al primo utilizzo."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    runtime = domain_data.get("runtime")
+    if runtime is None:
+        runtime = domain_data["runtime"] = WifiSensorTrackerRuntime(hass)
+    return runtime
@@ -0,0 +1,134 @@
+"""Scheduler condiviso delle scadenze consider_home dei tracker."""
+from __future__ import annotations
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from homeassistant.core import HomeAssistant, callback
+from .profiler import callback_name
+
+_LOGGER = logging.getLogger(__package__)
+
+
+class ExitScheduler:
+    """Mantiene in un heap le scadenze di uscita di tutti i tracker e arma un solo timer del loop per la più vicina.
+
+    La cancellazione è O(1): la voce viene tolta dalla mappa chiave → scadenza e la sua copia nell'heap
+    viene scartata quando arriva in cima. Il clock è iniettabile per simulare le scadenze senza attese reali.
+    """
+
+    def __init__(self, hass: HomeAssistant, clock: Optional[Callable[[], float]] = None) -> None:
+        self.hass = hass
+        self._clock = clock or time.monotonic
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._pending: Dict[Hashable, Tuple[float, int, Callable[[], Any]]] = {}
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_deadline: Optional[float] = None
+        # Impostato dal servizio profile solo per la durata della sessione di profilazione
+        self.profiler = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def now(self) -> float:
+        """Istante attuale del clock dello scheduler (monotono, o quello iniettato)."""
+        return self._clock()
+
+    def is_scheduled(self, key: Hashable) -> bool:
+        """Indica se per la chiave esiste una scadenza attiva."""
+        return key in self._pending
+
+    def remaining(self, key: Hashable) -> Optional[float]:
+        """Secondi mancanti alla scadenza della chiave, None se non programmata."""
+        entry = self._pending.get(key)
+        if entry is None:
+            return None
+        return max(0.0, entry[0] - self._clock())
+
+    @callback
+    def async_schedule(self, key: Hashable, delay: float, action: Callable[[], Any]) -> None:
+        """Programma l'azione dopo delay secondi, sostituendo un'eventuale scadenza già presente per la chiave."""
+        deadline = self._clock() + delay
+        seq = next(self._seq)
+        self._pending[key] = (deadline, seq, action)
+        heapq.heappush(self._heap, (deadline, seq, key))
+        self._async_rearm()
+
+    @callback
+    def async_cancel(self, key: Hashable) -> bool:
+        """Annulla la scadenza della chiave; restituisce True se era programmata."""
+        if self._pending.pop(key, None) is None:
+            return False
+        # Le voci annullate restano nell'heap: se diventano la maggioranza lo ricostruiamo
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._pending):
+            self._heap = [(d, s, k) for k, (d, s, _a) in self._pending.items()]
+            heapq.heapify(self._heap)
+        if not self._pending:
+            self._async_cancel_timer()
+        return True
+
+    @callback
+    def async_cancel_all(self) -> None:
+        """Annulla tutte le scadenze e il timer del loop."""
+        self._pending.clear()
+        self._heap.clear()
+        self._async_cancel_timer()
+
+    @callback
+    def async_run_due(self, now: Optional[float] = None) -> int:
+        """Esegue le azioni scadute rispetto a now (di default il clock) e restituisce quante ne ha eseguite."""
+        if now is None:
+            now = self._clock()
+        fired = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            deadline, seq, key = heapq.heappop(heap)
+            entry = self._pending.get(key)
+            # Voce annullata o sostituita da una scadenza più recente
+            if entry is None or entry[1] != seq:
+                continue
+            del self._pending[key]
+            try:
+                if self.profiler is None:
+                    entry[2]()
+                else:
+                    self.profiler.call(callback_name(entry[2]), entry[2])
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.exception("Error running consider_home exit for %s", key)
+            fired += 1
+        return fired
+
+    @callback
+    def _async_rearm(self) -> None:
+        """Arma il timer del loop sulla scadenza valida più vicina, solo se è cambiata."""
+        heap = self._heap
+        # Scarta in cima all'heap le voci non più valide
+        while heap and self._pending.get(heap[0][2], (None, None))[1] != heap[0][1]:
+            heapq.heappop(heap)
+        if not heap:
+            self._async_cancel_timer()
+            return
+        deadline = heap[0][0]
+        if self._timer is not None and self._timer_deadline == deadline:
+            return
+        self._async_cancel_timer()
+        self._timer_deadline = deadline
+        self._timer = self.hass.loop.call_later(max(0.0, deadline - self._clock()), self._async_on_timer)
+
+    @callback
+    def _async_cancel_timer(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._timer_deadline = None
+
+    @callback
+    def _async_on_timer(self) -> None:
+        """Risveglio del loop: esegue le scadenze arrivate e riarma per la successiva."""
+        self._timer = None
+        self._timer_deadline = None
+        self.async_run_due()
+        self._async_rearm()
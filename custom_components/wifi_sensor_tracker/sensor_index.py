@@ -0,0 +1,137 @@
+"""Indice dei sensori Wi-Fi compatibili e dei loro dispositivi, mantenuto aggiornato dagli eventi dell'entity registry."""
+from __future__ import annotations
+import logging
+from typing import Dict, Iterable, List, Optional, Set
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import slugify
+from . import DOMAIN
+
+_LOGGER = logging.getLogger(__package__)
+
+# Parti del nome dei sensori Wi-Fi esposti dall'App Companion (Android, iOS e varianti localizzate)
+WIFI_SENSOR_MARKERS = ("_wifi_connection", "_ssid", "_wi_fi_connection")
+
+# Dominio e chiave del config entry mobile_app da cui deriva il nome del servizio notify del dispositivo
+MOBILE_APP_DOMAIN = "mobile_app"
+ATTR_DEVICE_NAME = "device_name"
+
+
+def is_wifi_sensor(entity_id: str) -> bool:
+    """Indica se l'entity_id è un sensore Wi-Fi compatibile."""
+    return entity_id.startswith("sensor.") and any(marker in entity_id for marker in WIFI_SENSOR_MARKERS)
+
+
+class WifiSensorIndex:
+    """Insieme dei sensori compatibili costruito una volta dal registry e aggiornato in modo incrementale.
+
+    Per ogni sensore conserva anche il dispositivo a cui appartiene, così le richieste di posizione
+    raggiungono solo i telefoni dietro ai tracker e non ogni dispositivo con l'app companion.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self.hass = hass
+        self._entity_reg = entity_reg = er.async_get(hass)
+        # sensore → device_id del registry (None se l'entità non appartiene a un dispositivo)
+        self._devices: Dict[str, Optional[str]] = {
+            entity_id: entry.device_id
+            for entity_id, entry in entity_reg.entities.items()
+            if is_wifi_sensor(entity_id)
+        }
+        self._sensors: Set[str] = set(self._devices)
+        self._sorted: List[str] = sorted(self._sensors)
+        # L'indice vive quanto Home Assistant: il listener non viene mai rimosso
+        hass.bus.async_listen(
+            er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_registry_updated, event_filter=self._async_filter
+        )
+        _LOGGER.debug("Wi-Fi sensor index built with %d sensors.", len(self._sensors))
+
+    @property
+    def sensors(self) -> Set[str]:
+        """Sensori compatibili attualmente registrati."""
+        return self._sensors
+
+    def sorted(self) -> List[str]:
+        """Sensori compatibili in ordine alfabetico, come mostrati nei flow."""
+        return list(self._sorted)
+
+    def device_id(self, sensor: str) -> Optional[str]:
+        """device_id del dispositivo del sensore, None se sconosciuto."""
+        if sensor in self._devices:
+            return self._devices[sensor]
+        # Sensori configurati con un nome fuori dallo schema dell'App Companion (es. import YAML)
+        entry = self._entity_reg.async_get(sensor)
+        return entry.device_id if entry is not None else None
+
+    @callback
+    def async_notify_services(self, sensors: Iterable[str]) -> Dict[str, List[str]]:
+        """Servizi notify.mobile_app_* dei dispositivi dei sensori indicati, con i sensori serviti da ciascuno.
+
+        Il dispositivo è risolto dal registry al momento della richiesta: rinomine e nuove registrazioni
+        dell'app si riflettono senza altri listener.
+        """
+        device_reg = dr.async_get(self.hass)
+        services: Dict[str, List[str]] = {}
+        for sensor in sensors:
+            device_id = self.device_id(sensor)
+            device = device_reg.async_get(device_id) if device_id is not None else None
+            service = _mobile_app_notify_service(self.hass, device) if device is not None else None
+            if service is None:
+                _LOGGER.debug("No mobile_app notify service found for %s.", sensor)
+                continue
+            services.setdefault(service, []).append(sensor)
+        return services
+
+    @callback
+    def _async_filter(self, event_data) -> bool:
+        """Considera solo gli eventi che riguardano entità sensor."""
+        return event_data["entity_id"].startswith("sensor.") or (event_data.get("old_entity_id") or "").startswith("sensor.")
+
+    @callback
+    def _async_registry_updated(self, event: Event) -> None:
+        """Applica all'indice la creazione, rimozione o rinomina di un'entità."""
+        action = event.data["action"]
+        entity_id = event.data["entity_id"]
+        changed = False
+        if action == "remove":
+            self._devices.pop(entity_id, None)
+            if entity_id in self._sensors:
+                self._sensors.discard(entity_id)
+                changed = True
+        else:
+            old_entity_id = event.data.get("old_entity_id")
+            if old_entity_id and old_entity_id in self._sensors:
+                self._devices.pop(old_entity_id, None)
+                self._sensors.discard(old_entity_id)
+                changed = True
+            if is_wifi_sensor(entity_id):
+                # Anche un update che sposta il sensore su un altro dispositivo aggiorna l'indice
+                entry = self._entity_reg.async_get(entity_id)
+                self._devices[entity_id] = entry.device_id if entry is not None else None
+                if entity_id not in self._sensors:
+                    self._sensors.add(entity_id)
+                    changed = True
+        if changed:
+            self._sorted = sorted(self._sensors)
+
+
+def _mobile_app_notify_service(hass: HomeAssistant, device: dr.DeviceEntry) -> Optional[str]:
+    """Nome del servizio notify del dispositivo mobile_app, come lo registra l'integrazione mobile_app."""
+    for config_entry_id in device.config_entries:
+        config_entry = hass.config_entries.async_get_entry(config_entry_id)
+        if config_entry is not None and config_entry.domain == MOBILE_APP_DOMAIN:
+            device_name = config_entry.data.get(ATTR_DEVICE_NAME)
+            if device_name:
+                return f"mobile_app_{slugify(device_name)}"
+    return None
+
+
+@callback
+def async_get_sensor_index(hass: HomeAssistant) -> WifiSensorIndex:
+    """Restituisce l'indice condiviso, costruendolo al primo utilizzo."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    index = domain_data.get("sensor_index")
+    if index is None:
+        index = domain_data["sensor_index"] = WifiSensorIndex(hass)
+    return index
@@ -0,0 +1,130 @@
+"""Regole SSID → valore con SSID esatti, caratteri jolly ed espressioni regolari compilate in un solo matcher."""
+from __future__ import annotations
+import fnmatch
+import re
+import unicodedata
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple
+
+# Prefisso delle regole scritte come espressione regolare; le altre sono SSID esatti o caratteri jolly (*, ?, [])
+REGEX_PREFIX = "re:"
+_WILDCARDS = frozenset("*?[")
+
+# Oltre questo numero di SSID diversi la cache dei risultati viene svuotata
+MATCH_CACHE_SIZE = 1024
+
+
+def normalize_ssid(ssid: str) -> str:
+    """Forma normalizzata per il confronto senza distinzione di maiuscole e varianti Unicode."""
+    return unicodedata.normalize("NFKC", ssid).casefold()
+
+
+def is_pattern(pattern: str) -> bool:
+    """Indica se la regola è un'espressione regolare o contiene caratteri jolly, invece di un SSID esatto."""
+    return pattern.startswith(REGEX_PREFIX) or bool(_WILDCARDS.intersection(pattern))
+
+
+def _pattern_regex(pattern: str) -> Optional[str]:
+    """Espressione regolare della regola, None se la regola è un SSID esatto."""
+    if not is_pattern(pattern):
+        return None
+    if pattern.startswith(REGEX_PREFIX):
+        regex = pattern[len(REGEX_PREFIX):]
+        # Gruppi con nome riservati al matcher combinato
+        if re.compile(regex).groupindex:
+            raise re.error("named groups are not allowed")
+        return regex
+    return fnmatch.translate(pattern)
+
+
+class SsidMatcher:
+    """Matcher unico per un insieme ordinato di regole (pattern, valore).
+
+    Gli SSID esatti sono in un dizionario; caratteri jolly ed espressioni regolari sono combinati in una sola
+    regex con un gruppo con nome per regola, così un SSID costa una lookup e al più una scansione della regex
+    combinata, e i risultati restano in cache: il costo per evento non cresce con il numero di regole.
+    Le regex con gruppi propri restano compilate da sole, perché nella regex combinata i riferimenti
+    numerati (es. \\1) punterebbero ad altri gruppi. A parità di SSID vince la prima regola.
+    Solleva ValueError se una regola non è valida.
+    """
+
+    def __init__(self, rules: Sequence[Tuple[str, str]], normalize: bool = False) -> None:
+        self._normalize = normalize
+        self._exact: Dict[str, str] = {}
+        flags = re.IGNORECASE if normalize else 0
+        # Segmenti in ordine di regola: (regex, valori per gruppo r<i> della regex combinata, valore della regex singola)
+        self._segments: List[Tuple[Pattern[str], Optional[List[str]], Optional[str]]] = []
+        alternatives: List[str] = []
+        values: List[str] = []
+
+        def _flush() -> None:
+            if alternatives:
+                self._segments.append((re.compile("|".join(alternatives), flags), list(values), None))
+                alternatives.clear()
+                values.clear()
+
+        try:
+            for pattern, value in rules:
+                try:
+                    regex = _pattern_regex(normalize_ssid(pattern) if normalize and not pattern.startswith(REGEX_PREFIX) else pattern)
+                except re.error as err:
+                    raise ValueError(f"Invalid SSID rule '{pattern}': {err}") from err
+                if regex is None:
+                    self._exact.setdefault(normalize_ssid(pattern) if normalize else pattern, value)
+                elif re.compile(regex, flags).groups:
+                    _flush()
+                    self._segments.append((re.compile(regex, flags), None, value))
+                else:
+                    alternatives.append(f"(?P<r{len(values)}>{regex})")
+                    values.append(value)
+            _flush()
+        except re.error as err:
+            raise ValueError(f"Invalid SSID rules: {err}") from err
+        self._cache: Dict[str, Optional[str]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._exact) or bool(self._segments)
+
+    def match(self, ssid: str) -> Optional[str]:
+        """Valore della prima regola che corrisponde all'SSID, None se nessuna."""
+        try:
+            return self._cache[ssid]
+        except KeyError:
+            pass
+        key = normalize_ssid(ssid) if self._normalize else ssid
+        value = self._exact.get(key)
+        if value is None:
+            for regex, group_values, single_value in self._segments:
+                match = regex.fullmatch(key)
+                if match is not None:
+                    value = single_value if group_values is None else group_values[int(match.lastgroup[1:])]
+                    break
+        if len(self._cache) >= MATCH_CACHE_SIZE:
+            self._cache.clear()
+        self._cache[ssid] = value
+        return value
+
+
+def parse_ssid_rules(text: str) -> Optional[List[Dict[str, str]]]:
+    """Converte le righe "SSID o pattern = zone.xxx" del flow in regole del config entry; None se una riga non è valida."""
+    rules: List[Dict[str, str]] = []
+    for line in (text or "").splitlines():
+        if not line.strip():
+            continue
+        # L'SSID può contenere "=", l'entity_id della zona no
+        pattern, sep, zone_entity_id = line.rpartition("=")
+        pattern = pattern.strip()
+        zone_entity_id = zone_entity_id.strip()
+        if not sep or not pattern or not zone_entity_id.startswith("zone."):
+            return None
+        rules.append({"pattern": pattern, "zone": zone_entity_id})
+    return rules
+
+
+def format_ssid_rules(rules: List[Dict[str, str]]) -> str:
+    """Righe modificabili nel flow a partire dalle regole salvate nel config entry."""
+    return "\n".join(f"{rule['pattern']} = {rule['zone']}" for rule in rules)
+
+
+def parse_ssid_list(text: str) -> List[str]:
+    """SSID o pattern del flow, uno per riga."""
+    return [line.strip() for line in (text or "").splitlines() if line.strip()]
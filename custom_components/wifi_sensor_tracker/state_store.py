@@ -0,0 +1,178 @@
+"""Stato runtime dei tracker in colonne compatte indicizzate per slot."""
+from __future__ import annotations
+import math
+from array import array
+from typing import Collection, Dict, List, Optional, Set, Tuple
+from .zones import NOT_HOME_ZONE, ResolvedZone
+
+NO_ZONE = -1
+NO_DEADLINE = math.nan
+
+
+class TrackerStateStore:
+    """Colonne array per zona, connessione, scadenza di uscita e ultimo cambio di ogni tracker.
+
+    Le zone risolte sono internate in una piccola tabella: ogni tracker conserva solo l'indice,
+    così migliaia di tracker nella stessa zona condividono la stessa tupla e lo stesso payload di attributi.
+    Le zone internate contano i tracker che le usano (zona attuale o in attesa): quando nessuno le usa più,
+    ad esempio la versione precedente di una zona rinominata o spostata, il loro indice viene riusato.
+    """
+
+    def __init__(self) -> None:
+        # La zona not_home è sempre all'indice 0; la chiave esclude il payload degli attributi, che non è hashable
+        self._zones: List[ResolvedZone] = [NOT_HOME_ZONE]
+        self._zone_index: Dict[tuple, int] = {NOT_HOME_ZONE[:5]: 0}
+        # Riferimenti dalle colonne zone e pending_zone per ogni zona internata (not_home esclusa) e indici riusabili
+        self._refs: List[int] = [0]
+        self._unused: Set[int] = set()
+        # Indice inverso zona configurata → slot dei tracker che vi si trovano, per aggiornare solo quelli
+        self._zone_slots: Dict[str, Set[int]] = {}
+        self._free: List[int] = []
+        # Indice della zona attuale e di quella in attesa di conferma (smorzamento), NO_ZONE se assente;
+        # da modificare con set_zone e set_pending_zone, che mantengono i riferimenti alle zone internate
+        self.zone = array("i")
+        self.pending_zone = array("i")
+        # 1 se il dispositivo è connesso ad una rete configurata
+        self.connected = array("b")
+        # Ultimo stato scritto: zona, connessione e attributo gps_accuracy codificati come (zona * 2 + connesso) * 2 + gps,
+        # NO_ZONE se mai scritto, più ritardo adattivo in uso e pause osservate (-1 per i tracker non adattivi)
+        self.written = array("i")
+        self.written_delay = array("d")
+        self.written_gaps = array("i")
+        # Timestamp UTC della scadenza consider_home (NaN se assente) e dell'ultimo cambio di stato
+        self.exit_deadline = array("d")
+        self.last_change = array("d")
+        # Inizio della disconnessione in corso sul clock monotono dello scheduler (NaN se assente), per misurare le pause di riconnessione
+        self.disconnected_at = array("d")
+        # Contatori per tracker
+        self.writes_suppressed = array("I")
+        self.transitions_absorbed = array("I")
+
+    def __len__(self) -> int:
+        return len(self.zone) - len(self._free)
+
+    def allocate(self) -> int:
+        """Riserva uno slot per un nuovo tracker e lo inizializza a not_home."""
+        if self._free:
+            slot = self._free.pop()
+            self._reset(slot)
+            return slot
+        self.zone.append(0)
+        self.pending_zone.append(NO_ZONE)
+        self.connected.append(0)
+        self.written.append(NO_ZONE)
+        self.written_delay.append(-1.0)
+        self.written_gaps.append(-1)
+        self.exit_deadline.append(NO_DEADLINE)
+        self.last_change.append(0.0)
+        self.disconnected_at.append(NO_DEADLINE)
+        self.writes_suppressed.append(0)
+        self.transitions_absorbed.append(0)
+        return len(self.zone) - 1
+
+    def release(self, slot: int) -> None:
+        """Libera lo slot di un tracker rimosso perché venga riusato."""
+        self._reset(slot)
+        self._free.append(slot)
+
+    def _reset(self, slot: int) -> None:
+        self.set_zone(slot, 0)
+        self.set_pending_zone(slot, NO_ZONE)
+        self.connected[slot] = 0
+        self.set_written(slot, (NO_ZONE, -1.0, -1))
+        self.exit_deadline[slot] = NO_DEADLINE
+        self.last_change[slot] = 0.0
+        self.disconnected_at[slot] = NO_DEADLINE
+        self.writes_suppressed[slot] = 0
+        self.transitions_absorbed[slot] = 0
+
+    def intern(self, resolved: ResolvedZone) -> int:
+        """Restituisce l'indice della zona risolta, aggiungendola alla tabella se nuova.
+
+        L'indice di una zona nuova va assegnato subito con set_zone o set_pending_zone: finché nessun tracker
+        la usa può essere riusato dalla prossima zona internata.
+        """
+        key = resolved[:5]
+        index = self._zone_index.get(key)
+        if index is None:
+            if self._unused:
+                # Riusa l'indice di una zona che nessun tracker usa più
+                index = self._unused.pop()
+                del self._zone_index[self._zones[index][:5]]
+                self._zones[index] = resolved
+            else:
+                index = len(self._zones)
+                self._zones.append(resolved)
+                self._refs.append(0)
+            self._zone_index[key] = index
+            self._unused.add(index)
+        return index
+
+    def _ref(self, index: int) -> None:
+        if index > 0:
+            if not self._refs[index]:
+                self._unused.discard(index)
+            self._refs[index] += 1
+
+    def _unref(self, index: int) -> None:
+        if index > 0:
+            self._refs[index] -= 1
+            if not self._refs[index]:
+                self._unused.add(index)
+
+    def set_pending_zone(self, slot: int, index: int) -> None:
+        """Imposta la zona in attesa di conferma del tracker (NO_ZONE per annullarla)."""
+        old_index = self.pending_zone[slot]
+        if old_index == index:
+            return
+        self._ref(index)
+        self._unref(old_index)
+        self.pending_zone[slot] = index
+
+    def set_zone(self, slot: int, index: int) -> None:
+        """Imposta la zona del tracker mantenendo aggiornati i riferimenti e l'indice inverso zona → slot."""
+        old_index = self.zone[slot]
+        if old_index == index:
+            return
+        self._ref(index)
+        self._unref(old_index)
+        old_source = self._zones[old_index].source
+        if old_source is not None:
+            slots = self._zone_slots[old_source]
+            slots.discard(slot)
+            if not slots:
+                del self._zone_slots[old_source]
+        self.zone[slot] = index
+        source = self._zones[index].source
+        if source is not None:
+            self._zone_slots.setdefault(source, set()).add(slot)
+
+    def written_snapshot(self, slot: int) -> Tuple[int, float, int]:
+        """Ultimo stato scritto dal tracker, confrontabile con quello attuale."""
+        return self.written[slot], self.written_delay[slot], self.written_gaps[slot]
+
+    def set_written(self, slot: int, snapshot: Tuple[int, float, int]) -> None:
+        """Registra lo stato appena scritto dal tracker."""
+        self.written[slot], self.written_delay[slot], self.written_gaps[slot] = snapshot
+
+    def slots_in_zone(self, zone_entity_id: str) -> Collection[int]:
+        """Slot dei tracker che si trovano nella zona configurata indicata."""
+        return self._zone_slots.get(zone_entity_id, ())
+
+    def zone_at(self, index: int) -> ResolvedZone:
+        """Zona internata all'indice indicato, valida finché è usata da un tracker o fino alla prossima zona internata."""
+        return self._zones[index]
+
+    def zone_of(self, slot: int) -> ResolvedZone:
+        """Zona attuale del tracker."""
+        return self._zones[self.zone[slot]]
+
+    def pending_zone_of(self, slot: int) -> Optional[ResolvedZone]:
+        """Zona in attesa di conferma, None se non c'è un cambio in corso."""
+        index = self.pending_zone[slot]
+        return None if index == NO_ZONE else self._zones[index]
+
+    def deadline_of(self, slot: int) -> Optional[float]:
+        """Timestamp UTC della scadenza consider_home, None se non programmata."""
+        deadline = self.exit_deadline[slot]
+        return None if math.isnan(deadline) else deadline
@@ -0,0 +1,289 @@
+"""Tabella precalcolata SSID/BSSID → zona condivisa dai tracker di un config entry."""
+from __future__ import annotations
+import logging
+from functools import partial
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+from homeassistant.const import ATTR_FRIENDLY_NAME, ATTR_LATITUDE, ATTR_LONGITUDE, STATE_HOME, STATE_NOT_HOME
+from homeassistant.components.zone import ENTITY_ID_HOME
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, State, callback
+from .bssid import ATTR_BSSID, BssidIndex
+from .dispatcher import SensorStateDispatcher
+from .ssid_matcher import SsidMatcher, is_pattern
+
+_LOGGER = logging.getLogger(__package__)
+
+# Attributi di una zona che entrano nella zona risolta
+ZONE_ATTRIBUTES = (ATTR_FRIENDLY_NAME, ATTR_LATITUDE, ATTR_LONGITUDE)
+
+
+# Payload vuoto condiviso dai tracker not_home o in una zona senza entity_id né coordinate
+EMPTY_ATTRIBUTES: Mapping[str, Any] = MappingProxyType({})
+
+
+class ResolvedZone(NamedTuple):
+    """Zona risolta per un SSID: stato del tracker, entity_id della zona, coordinate e attributi precalcolati.
+
+    source è la zona configurata da cui deriva, anche quando non esiste più e zone_entity_id è None.
+    """
+
+    state: str
+    zone_entity_id: Optional[str]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    source: Optional[str]
+    attributes: Mapping[str, Any]
+
+
+def _zone(
+    state: str,
+    zone_entity_id: Optional[str],
+    latitude: Optional[float],
+    longitude: Optional[float],
+    source: Optional[str] = None,
+) -> ResolvedZone:
+    """Crea la zona risolta con il payload di attributi immutabile riusato da tutti i tracker in quella zona."""
+    attrs = {}
+    if zone_entity_id is not None:
+        attrs["zone_entity_id"] = zone_entity_id
+    if latitude is not None and longitude is not None:
+        attrs["latitude"] = latitude
+        attrs["longitude"] = longitude
+    return ResolvedZone(
+        state, zone_entity_id, latitude, longitude, source or zone_entity_id,
+        MappingProxyType(attrs) if attrs else EMPTY_ATTRIBUTES,
+    )
+
+
+# Le coordinate di casa le aggiunge il core: la zona non va mai aggiornata né indicizzata per i tracker
+HOME_ZONE = _zone(STATE_HOME, ENTITY_ID_HOME, None, None)._replace(source=None)
+# Zona dei tracker non connessi ad alcuna rete configurata
+NOT_HOME_ZONE = _zone(STATE_NOT_HOME, None, None, None)
+
+
+def zone_from_state(state: str) -> ResolvedZone:
+    """Zona senza entity_id ricostruita dal solo stato, usata per ripristinare i tracker dopo un riavvio."""
+    return NOT_HOME_ZONE if state == STATE_NOT_HOME else _zone(state, None, None, None)
+
+
+def resolve_zone(zone_entity_id: str, zone_state: Optional[State]) -> ResolvedZone:
+    """Calcola la zona risolta a partire dall'entity_id configurato e dal suo stato attuale."""
+    # Se la zona extra è "zone.home", trattala come home: il core prenderà le coordinate dalla zona
+    if zone_entity_id == ENTITY_ID_HOME:
+        return HOME_ZONE
+    if zone_state:
+        return _zone(
+            # friendly name (es. "Lavoro", "Scuola", ecc.) con fallback se la zona non avesse un friendly name
+            zone_state.attributes.get(ATTR_FRIENDLY_NAME, zone_entity_id.partition("zone.")[2]),
+            zone_entity_id,
+            zone_state.attributes.get(ATTR_LATITUDE),
+            zone_state.attributes.get(ATTR_LONGITUDE),
+        )
+    # Zona non esistente (esempio: zona cancellata ma rimasta nelle opzioni dell'integrazione): togli "zone." e crea un friendly name
+    fallback = zone_entity_id.partition("zone.")[2].capitalize() or zone_entity_id
+    _LOGGER.debug("Zone %s not found in HA, using fallback '%s'", zone_entity_id, fallback)
+    return _zone(fallback, None, None, None, zone_entity_id)
+
+
+class ZoneCache:
+    """Zone risolte condivise da tutti i config entry, con un solo listener per zona tramite il dispatcher.
+
+    Ogni zona viene seguita finché almeno una tabella SSID → zona la usa; alle modifiche
+    la cache ricalcola la zona una volta e la notifica solo alle tabelle iscritte.
+    """
+
+    def __init__(self, hass: HomeAssistant, dispatcher: SensorStateDispatcher) -> None:
+        self.hass = hass
+        self._dispatcher = dispatcher
+        self._resolved: Dict[str, ResolvedZone] = {}
+        self._subscribers: Dict[str, List[Callable[[str, ResolvedZone], None]]] = {}
+        self._remove_listeners: Dict[str, CALLBACK_TYPE] = {}
+        # Notificati dopo le tabelle per ogni zona seguita che cambia, qualunque essa sia
+        self._change_listeners: List[Callable[[str, ResolvedZone], None]] = []
+
+    def get(self, zone_entity_id: str) -> ResolvedZone:
+        """Zona risolta dalla cache se seguita, altrimenti calcolata dallo stato attuale."""
+        resolved = self._resolved.get(zone_entity_id)
+        if resolved is None:
+            resolved = resolve_zone(zone_entity_id, self.hass.states.get(zone_entity_id))
+        return resolved
+
+    @callback
+    def async_subscribe(self, zone_entity_id: str, action: Callable[[str, ResolvedZone], None]) -> CALLBACK_TYPE:
+        """Notifica action ad ogni modifica della zona; alla prima iscrizione inizia a seguirla."""
+        subscribers = self._subscribers.get(zone_entity_id)
+        if subscribers is None:
+            subscribers = self._subscribers[zone_entity_id] = []
+            self._resolved[zone_entity_id] = resolve_zone(zone_entity_id, self.hass.states.get(zone_entity_id))
+            if zone_entity_id != ENTITY_ID_HOME:
+                # Lo stato di una zona è il numero di persone presenti: contano solo nome e coordinate
+                self._remove_listeners[zone_entity_id] = self._dispatcher.async_add(
+                    zone_entity_id, partial(self._async_zone_changed, zone_entity_id), ZONE_ATTRIBUTES, ignore_state=True
+                )
+        subscribers.append(action)
+
+        @callback
+        def _unsubscribe() -> None:
+            subscribers.remove(action)
+            if not subscribers:
+                del self._subscribers[zone_entity_id]
+                self._resolved.pop(zone_entity_id, None)
+                remove = self._remove_listeners.pop(zone_entity_id, None)
+                if remove:
+                    remove()
+
+        return _unsubscribe
+
+    @callback
+    def async_listen_changes(self, action: Callable[[str, ResolvedZone], None]) -> CALLBACK_TYPE:
+        """Notifica action ad ogni modifica di una qualsiasi zona seguita, dopo l'aggiornamento delle tabelle."""
+        self._change_listeners.append(action)
+
+        @callback
+        def _remove() -> None:
+            self._change_listeners.remove(action)
+
+        return _remove
+
+    @callback
+    def _async_zone_changed(self, zone_entity_id: str, new_state: Optional[State]) -> None:
+        """Ricalcola la zona modificata o rimossa e la inoltra alle tabelle che la usano."""
+        resolved = resolve_zone(zone_entity_id, new_state)
+        previous = self._resolved.get(zone_entity_id)
+        # Zona risolta identica (stessi stato, entity_id, coordinate e sorgente): nessuna tabella né tracker da aggiornare
+        if previous is not None and previous[:5] == resolved[:5]:
+            return
+        self._resolved[zone_entity_id] = resolved
+        for action in list(self._subscribers.get(zone_entity_id, [])):
+            action(zone_entity_id, resolved)
+        for action in list(self._change_listeners):
+            action(zone_entity_id, resolved)
+        _LOGGER.debug("Zone %s changed, resolution tables updated.", zone_entity_id)
+
+
+class ZoneTable:
+    """Tabella SSID → zona di un config entry: risolta una sola volta e aggiornata solo per le zone modificate o rimosse.
+
+    Le voci BSSID opzionali (complete o per prefisso) hanno la precedenza sugli SSID. Gli SSID non trovati
+    nella tabella esatta passano dal matcher compilato con SSID di casa aggiuntivi, caratteri jolly e regex.
+    """
+
+    def __init__(self, zone_cache: ZoneCache, ssid_home: str, ssid_zone_map: Dict[str, str], **options: Any) -> None:
+        self._zone_cache = zone_cache
+        self._set_config(ssid_home, ssid_zone_map, **options)
+        self._table: Dict[str, ResolvedZone] = {ssid_home: HOME_ZONE}
+        self._zones: Dict[str, ResolvedZone] = {}
+        self._users = 0
+        self._remove_listeners: List[CALLBACK_TYPE] = []
+
+    def _set_config(
+        self,
+        ssid_home: str,
+        ssid_zone_map: Dict[str, str],
+        bssid_zone_map: Optional[Dict[str, str]] = None,
+        home_ssids: Sequence[str] = (),
+        ssid_rules: Sequence[Dict[str, str]] = (),
+        normalize: bool = False,
+    ) -> None:
+        self._ssid_home = ssid_home
+        self._ssid_zone_map = dict(ssid_zone_map)
+        self._bssid_index = BssidIndex(bssid_zone_map or {})
+        # SSID di casa esatti: la rete principale e quelle aggiuntive senza caratteri jolly
+        self._home_ssids = [ssid_home] + [ssid for ssid in home_ssids if not is_pattern(ssid)]
+        # Regole in ordine di priorità: casa, SSID esatti delle zone extra, regole con pattern
+        rules = [(ssid_home, ENTITY_ID_HOME)]
+        rules.extend((ssid, ENTITY_ID_HOME) for ssid in home_ssids)
+        rules.extend(self._ssid_zone_map.items())
+        rules.extend((rule["pattern"], rule["zone"]) for rule in ssid_rules)
+        self._matcher = SsidMatcher(rules, normalize)
+        # Senza pattern né normalizzazione la tabella esatta è già completa e il matcher non serve
+        self._use_matcher = normalize or bool(ssid_rules) or any(is_pattern(ssid) for ssid in home_ssids)
+        # Mappa inversa zona → SSID che puntano a quella zona, usata per aggiornare solo le voci interessate
+        self._zone_ssids: Dict[str, List[str]] = {}
+        for ssid, zone_entity_id in self._ssid_zone_map.items():
+            self._zone_ssids.setdefault(zone_entity_id, []).append(ssid)
+        # Anche le zone usate solo da voci BSSID o da regole vanno seguite
+        for zone_entity_id in self._bssid_index.zones:
+            self._zone_ssids.setdefault(zone_entity_id, [])
+        for rule in ssid_rules:
+            self._zone_ssids.setdefault(rule["zone"], [])
+        # Con voci BSSID i tracker devono ricevere anche i cambi di access point a parità di SSID
+        self.watched_attributes: Tuple[str, ...] = (ATTR_BSSID,) if self._bssid_index else ()
+
+    @callback
+    def _async_subscribe_zones(self) -> None:
+        self._remove_listeners = [
+            self._zone_cache.async_subscribe(zone_entity_id, self._async_zone_changed)
+            for zone_entity_id in self._zone_ssids
+        ]
+
+    @callback
+    def _async_unsubscribe_zones(self) -> None:
+        for remove in self._remove_listeners:
+            remove()
+        self._remove_listeners = []
+
+    @callback
+    def async_update(self, ssid_home: str, ssid_zone_map: Dict[str, str], **options: Any) -> None:
+        """Sostituisce SSID di casa, mappe SSID/BSSID → zona e regole mantenendo la tabella in uso dai tracker."""
+        # Iscrivo le nuove zone prima di rimuovere le vecchie, così le zone rimaste non perdono il listener
+        old_listeners = self._remove_listeners
+        self._set_config(ssid_home, ssid_zone_map, **options)
+        if self._users:
+            self._async_subscribe_zones()
+            for remove in old_listeners:
+                remove()
+        self._async_rebuild()
+
+    @callback
+    def _async_rebuild(self) -> None:
+        """Risolve tutte le zone e tutti gli SSID configurati a partire dalla cache."""
+        zones = {zone_entity_id: self._zone_cache.get(zone_entity_id) for zone_entity_id in self._zone_ssids}
+        table = {ssid: zones[zone_entity_id] for ssid, zone_entity_id in self._ssid_zone_map.items()}
+        # Gli SSID di casa hanno sempre la precedenza su un'eventuale zona extra con lo stesso nome
+        for ssid in self._home_ssids:
+            table[ssid] = HOME_ZONE
+        self._zones = zones
+        self._table = table
+
+    def _resolved(self, zone_entity_id: str) -> ResolvedZone:
+        resolved = self._zones.get(zone_entity_id)
+        return resolved if resolved is not None else self._zone_cache.get(zone_entity_id)
+
+    def get(self, ssid, bssid=None) -> Optional[ResolvedZone]:
+        """Restituisce la zona risolta per BSSID o SSID, None se nessuno dei due è configurato."""
+        if bssid and self._bssid_index:
+            zone_entity_id = self._bssid_index.lookup(bssid)
+            if zone_entity_id is not None:
+                return self._resolved(zone_entity_id)
+        resolved = self._table.get(ssid)
+        if resolved is None and self._use_matcher:
+            zone_entity_id = self._matcher.match(ssid)
+            if zone_entity_id is not None:
+                return self._resolved(zone_entity_id)
+        return resolved
+
+    @callback
+    def async_attach(self) -> None:
+        """Registra un tracker che usa la tabella; al primo si iscrive alle zone configurate nella cache condivisa."""
+        if self._users == 0:
+            # La tabella viene risolta quando il primo tracker inizia ad usarla, da lì in poi la mantengono aggiornata le notifiche della cache
+            self._async_subscribe_zones()
+            self._async_rebuild()
+        self._users += 1
+
+    @callback
+    def async_detach(self) -> None:
+        """Rimuove un tracker che usava la tabella; all'ultimo annulla le iscrizioni alle zone."""
+        self._users -= 1
+        if self._users == 0:
+            self._async_unsubscribe_zones()
+
+    @callback
+    def _async_zone_changed(self, zone_entity_id: str, resolved: ResolvedZone) -> None:
+        """Aggiorna le voci della tabella che puntano alla zona modificata o rimossa."""
+        if zone_entity_id in self._zones:
+            self._zones[zone_entity_id] = resolved
+        for ssid in self._zone_ssids.get(zone_entity_id, []):
+            if ssid not in self._home_ssids:
+                self._table[ssid] = resolved